@@ -0,0 +1,200 @@
+import argparse
+import json
+import sys
+import time
+from functools import partial
+
+from engine import MAX_DEPTH, MoveOrdering, SearchContext, TranspositionTable, iterative_deepening, minimax
+from perft import POSITIONS, parse_diagram
+
+# Banco de pruebas de la búsqueda: cada modo de búsqueda se ejecuta sobre las
+# posiciones de perft a profundidad fija y con tiempo fijo. Los resultados se
+# guardan en JSON y se comparan con una línea base: a profundidad fija los
+# nodos y el movimiento elegido deben coincidir exactamente, y los nodos por
+# segundo del total de cada búsqueda y modo no pueden caer más de la
+# tolerancia (por posición hay demasiado ruido). La búsqueda en paralelo no
+# repite sus nodos, pero a profundidad fija debe dar el mismo resultado que
+# minimax en serie.
+#
+#   python bench.py                      comparar con bench_baseline.json
+#   python bench.py --update-baseline    guardar una línea base nueva
+#
+# Los nodos por segundo dependen de la máquina: la línea base debe generarse
+# en la misma máquina en la que se compara.
+
+BASELINE = "bench_baseline.json"
+OUTPUT = "bench_results.json"
+TT_SIZE_MB = 16
+
+
+def run_minimax(position, white, depth, time_limit, **options):
+    transposition_table = TranspositionTable(TT_SIZE_MB)
+    context = SearchContext(transposition_table, ordering=MoveOrdering(), **options)
+    start = time.perf_counter()
+    score, move = iterative_deepening(position, white, time_limit, context, depth)
+    elapsed = time.perf_counter() - start
+    stats = context.stats.to_dict()
+    return {
+        "depth": context.depth,
+        "nodes": context.nodes,
+        "quiescence_nodes": context.quiescence_nodes,
+        "seconds": elapsed,
+        "time_to_depth": [iteration["seconds"] for iteration in stats["iterations"]],
+        "tt_hit_rate": transposition_table.hit_rate(),
+        "ebf": stats["iterations"][-1]["ebf"] if stats["iterations"] else None,
+        "first_move_cutoff_rate": stats["first_move_cutoff_rate"],
+        "score": score,
+        "move": move,
+    }
+
+
+def run_parallel(position, white, depth, time_limit):
+    # Los procesos se crean una sola vez para todo el banco de pruebas
+    from engine.parallel import ParallelSearch
+    if "parallel" not in _searchers:
+        _searchers["parallel"] = ParallelSearch(tt_size_mb=TT_SIZE_MB)
+    search = _searchers["parallel"]
+    start = time.perf_counter()
+    score, move = search.iterative_deepening(position, white, time_limit, depth)
+    elapsed = time.perf_counter() - start
+    result = {
+        "depth": search.depth,
+        "nodes": search.nodes,
+        "seconds": elapsed,
+        "time_to_depth": None,
+        "tt_hit_rate": None,
+        "score": score,
+        "move": move,
+    }
+    if time_limit == float('inf'):
+        # Una búsqueda nueva a profundidad fija, en paralelo y con minimax en
+        # serie, para que compare() compruebe que dan lo mismo
+        fixed = search.search(position, depth, white)
+        serial = minimax(position.copy(), depth, float('-inf'), float('inf'), white,
+                         SearchContext(TranspositionTable(TT_SIZE_MB)))
+        result["fixed"] = [fixed[0], list(fixed[1]) if fixed[1] is not None else None]
+        result["serial"] = [serial[0], list(serial[1]) if serial[1] is not None else None]
+    return result
+
+
+def run_batch(position, white, depth, time_limit):
+    # Evalúa con NumPy las hojas tranquilas de la frontera, con solo los
+    # términos de Position.evaluate; las que tienen capturas pendientes siguen
+    # pasando por la quiescencia. No comparte la tabla de transposición en
+    # esas hojas, así que sus nodos y movimientos se comparan con su propia
+    # línea base y no con los de minimax.
+    from engine.batch_eval import BatchEvaluator
+    return run_minimax(position, white, depth, time_limit, evaluator=BatchEvaluator(0, 0, 0))
+
+
+_searchers = {}
+
+# Modo de búsqueda -> (función, nodos reproducibles a profundidad fija)
+SEARCHES = {
+    "minimax": (run_minimax, True),
+    "pvs": (partial(run_minimax, pvs=True), True),
+    "reduced": (partial(run_minimax, pvs=True, lmr=True, futility=True), True),
+    "probcut": (partial(run_minimax, pvs=True, lmr=True, futility=True, probcut=True), True),
+    "batch": (run_batch, True),
+    "parallel": (run_parallel, False),
+}
+
+
+def run_suite(searches, positions, depth, time_limit):
+    results = {}
+    for search in searches:
+        run, _ = SEARCHES[search]
+        for name in positions:
+            rows, white = POSITIONS[name]
+            for mode, args in (("depth", (depth, float('inf'))), ("time", (MAX_DEPTH, time_limit))):
+                result = run(parse_diagram(rows), white, *args)
+                result["nps"] = result["nodes"] / result["seconds"] if result["seconds"] > 0 else 0
+                result["move"] = list(result["move"]) if result["move"] is not None else None
+                results[f"{search}/{name}/{mode}"] = result
+                print(f"{search:<9} {name:<14} {mode:<6} {result['depth']:>4} {result['nodes']:>10} "
+                      f"{result['nps']:>10.0f} {result['seconds']:>8.3f} {str(result['move']):>12}")
+        for mode in ("depth", "time"):
+            runs = [results[f"{search}/{name}/{mode}"] for name in positions]
+            nodes = sum(run["nodes"] for run in runs)
+            seconds = sum(run["seconds"] for run in runs)
+            results[f"{search}/total/{mode}"] = {
+                "nodes": nodes,
+                "seconds": seconds,
+                "nps": nodes / seconds if seconds > 0 else 0,
+            }
+            print(f"{search:<9} {'total':<14} {mode:<6} {'':>4} {nodes:>10} {nodes / seconds:>10.0f} {seconds:>8.3f}")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    # Devuelve la lista de regresiones frente a la línea base
+    errors = []
+    for key, result in results.items():
+        search, name, mode = key.split("/")
+        if search == "parallel" and mode == "depth" and name != "total":
+            # Una búsqueda a profundidad fija debe dar la misma puntuación y el
+            # mismo movimiento que minimax en serie. Con la profundización
+            # iterativa el orden de la raíz depende de la historia de cada
+            # proceso y un empate puede resolverse con otro movimiento, así
+            # que ahí solo se compara la puntuación.
+            if result["fixed"] != result["serial"]:
+                errors.append(f"{key}: la búsqueda a profundidad fija da {result['fixed']}, minimax en serie "
+                              f"{result['serial']}")
+            serial = results.get(f"minimax/{name}/depth") or baseline.get(f"minimax/{name}/depth")
+            if serial is not None and serial["depth"] == result["depth"] and serial["score"] != result["score"]:
+                errors.append(f"{key}: puntuación {result['score']}, minimax da {serial['score']}")
+        expected = baseline.get(key)
+        if expected is None:
+            continue
+        if mode == "depth" and SEARCHES[search][1]:
+            if result["nodes"] != expected["nodes"]:
+                errors.append(f"{key}: {result['nodes']} nodos, la línea base tiene {expected['nodes']}")
+            if result.get("move") != expected.get("move"):
+                errors.append(f"{key}: movimiento {result['move']}, la línea base tiene {expected['move']}")
+        if name == "total" and result["nps"] < expected["nps"] * (1 - tolerance):
+            errors.append(f"{key}: {result['nps']:.0f} nodos/s, la línea base tiene {expected['nps']:.0f}")
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banco de pruebas de la búsqueda")
+    parser.add_argument("--search", choices=list(SEARCHES), action="append")
+    parser.add_argument("--position", choices=list(POSITIONS), action="append")
+    parser.add_argument("--depth", type=int, default=9)
+    parser.add_argument("--time", type=float, default=0.5)
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="caída máxima de nodos/s permitida, en fracción de la línea base")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--output", default=OUTPUT)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    print(f"{'búsqueda':<9} {'posición':<14} {'modo':<6} {'prof':>4} {'nodos':>10} {'nodos/s':>10} "
+          f"{'segundos':>8} {'movimiento':>12}")
+    try:
+        results = run_suite(args.search or ["minimax"], args.position or POSITIONS, args.depth, args.time)
+    finally:
+        for searcher in _searchers.values():
+            searcher.close()
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        return 0
+
+    try:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        print(f"no hay línea base en {args.baseline}; usa --update-baseline para crearla")
+        return 1
+    errors = compare(results, baseline, args.tolerance)
+    for error in errors:
+        print(f"ERROR: {error}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
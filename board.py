@@ -1,6 +1,24 @@
 import pygame
+from constants import ROWS, COLS, SQUARE_SIZE, BLACK, WHITE, RED
+from engine import Position, from_square, to_square
+from engine import zobrist
+from engine.bitboard import SQUARE_VALUES
 from piece import Piece
 
+_background = None
+
+
+def get_background():
+    # Las casillas no cambian: se dibujan una vez y cada cuadro copia la superficie
+    global _background
+    if _background is None:
+        _background = pygame.Surface((COLS * SQUARE_SIZE, ROWS * SQUARE_SIZE)).convert()
+        _background.fill(BLACK)
+        for row in range(ROWS):
+            for col in range(row % 2, COLS, 2):
+                pygame.draw.rect(_background, WHITE, (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+    return _background
+
 
 class Board:
     def __init__(self):
@@ -9,13 +27,13 @@ class Board:
         self.red_left = 12
         self.white_kings = 0
         self.red_kings = 0
+        self.hash = 0
+        # Evaluación en décimas de punto, mantenida por move/remove/make_king
+        self.score = 0
         self.create_board()
 
     def draw_squares(self, win):
-        win.fill(BLACK)
-        for row in range(ROWS):
-            for col in range(row % 2, COLS, 2):
-                pygame.draw.rect(win, WHITE, (row * SQUARE_SIZE, col * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+        win.blit(get_background(), (0, 0))
 
     def create_board(self):
         for row in range(ROWS):
@@ -30,6 +48,45 @@ class Board:
                         self.board[row].append(0)
                 else:
                     self.board[row].append(0)
+        position = self.to_position()
+        self.hash = position.key
+        self.score = position.score
+
+    def piece_key(self, piece):
+        kind = zobrist.piece_kind(piece.color == WHITE, piece.king)
+        return zobrist.PIECE_KEYS[kind][to_square(piece.row, piece.col)]
+
+    def piece_value(self, piece):
+        kind = zobrist.piece_kind(piece.color == WHITE, piece.king)
+        return SQUARE_VALUES[kind][to_square(piece.row, piece.col)]
+
+    def to_position(self):
+        masks = [0, 0, 0, 0]
+        for row in self.board:
+            for piece in row:
+                if piece != 0:
+                    masks[zobrist.piece_kind(piece.color == WHITE, piece.king)] |= 1 << to_square(piece.row, piece.col)
+        return Position(*masks)
+
+    @classmethod
+    def from_position(cls, position):
+        board = cls()
+        board.board = [[0] * COLS for _ in range(ROWS)]
+        for bitboard, color, king in ((position.white_men, WHITE, False), (position.white_kings, WHITE, True),
+                                      (position.red_men, RED, False), (position.red_kings, RED, True)):
+            for square in range(32):
+                if bitboard >> square & 1:
+                    row, col = from_square(square)
+                    piece = Piece(row, col, color)
+                    piece.king = king
+                    board.board[row][col] = piece
+        board.white_left = position.white().bit_count()
+        board.red_left = position.red().bit_count()
+        board.white_kings = position.white_kings.bit_count()
+        board.red_kings = position.red_kings.bit_count()
+        board.hash = position.key
+        board.score = position.score
+        return board
 
     def draw(self, win):
         self.draw_squares(win)
@@ -42,49 +99,81 @@ class Board:
     def move(self, piece, row, col):
         # Mover la pieza a la nueva posición
         self.board[piece.row][piece.col], self.board[row][col] = self.board[row][col], self.board[piece.row][piece.col]
+        self.hash ^= self.piece_key(piece)
+        self.score -= self.piece_value(piece)
         piece.move(row, col)
+        self.hash ^= self.piece_key(piece)
+        self.score += self.piece_value(piece)
 
         # Promocionar a dama si llega al borde opuesto
         if (row == 0 and piece.color == RED) or (row == ROWS - 1 and piece.color == WHITE):
+            self.make_king(piece)
+
+    def make_king(self, piece):
+        if not piece.king:
+            self.hash ^= self.piece_key(piece)
+            self.score -= self.piece_value(piece)
             piece.make_king()
+            self.hash ^= self.piece_key(piece)
+            self.score += self.piece_value(piece)
+            if piece.color == WHITE:
+                self.white_kings += 1
+            else:
+                self.red_kings += 1
 
     def remove(self, pieces):
         for piece in pieces:
             self.board[piece.row][piece.col] = 0
+            self.hash ^= self.piece_key(piece)
+            self.score -= self.piece_value(piece)
             if piece.color == WHITE:
                 self.white_left -= 1
+                self.white_kings -= piece.king
             else:
                 self.red_left -= 1
+                self.red_kings -= piece.king
+
+    def apply_move(self, piece, row, col, skip):
+        undo = (piece, piece.row, piece.col, piece.king, skip,
+                self.white_left, self.red_left, self.white_kings, self.red_kings, self.hash, self.score)
+        self.move(piece, row, col)
+        if skip:
+            self.remove(skip)
+        return undo
+
+    def undo_move(self, undo):
+        (piece, row, col, king, skip,
+         self.white_left, self.red_left, self.white_kings, self.red_kings, self.hash, self.score) = undo
+        self.board[piece.row][piece.col] = 0
+        self.board[row][col] = piece
+        piece.move(row, col)
+        piece.king = king
+        for captured in skip:
+            self.board[captured.row][captured.col] = captured
+
+    def unpack_move(self, move):
+        # Traduce un movimiento de Position a (pieza, fila, columna, capturadas)
+        origin, target, captured = move
+        row, col = from_square(origin)
+        piece = self.board[row][col]
+        row, col = from_square(target)
+        skip = []
+        for square in range(32):
+            if captured >> square & 1:
+                r, c = from_square(square)
+                skip.append(self.board[r][c])
+        return piece, row, col, skip
 
     def evaluate(self):
-        score = (self.white_left - self.red_left) + (self.white_kings - self.red_kings) * 1.8
+        # Material, damas, avance y bordes se llevan sumados en self.score
+        return self.score / 10
 
-        # Posiciones avanzadas
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.board[row][col]
-                if piece != 0:
-                    position_score = 0.1 * row if piece.color == WHITE else 0.1 * (ROWS - row - 1)
-                    if piece.color == WHITE:
-                        score += position_score
-                    elif piece.color == RED:
-                        score -= position_score
+    def has_any_move(self, color):
+        return self.to_position().has_any_move(color == WHITE)
 
-                    # Bonus de borde para protección
-                    if col == 0 or col == COLS - 1:
-                        score += 0.2 if piece.color == WHITE else -0.2
-
-        return score
-
-    def is_game_over(self):
-        # El juego termina si alguno de los jugadores no tiene piezas
-        if self.white_left <= 0 or self.red_left <= 0:
-            return True
-
-        # El juego también termina si ninguno de los jugadores tiene movimientos válidos
-        white_moves = any(self.get_valid_moves(piece) for piece in self.get_all_pieces(WHITE))
-        red_moves = any(self.get_valid_moves(piece) for piece in self.get_all_pieces(RED))
-        return not white_moves or not red_moves
+    def is_game_over(self, color):
+        # El juego termina si el jugador al que le toca no tiene piezas ni movimientos válidos
+        return not self.has_any_move(color)
 
     def get_all_pieces(self, color):
         pieces = []
@@ -105,22 +194,18 @@ class Board:
             left = piece.col - 1
             right = piece.col + 1
             row = piece.row
-
             if piece.color == WHITE or piece.king:
                 moves.update(self._traverse_left(row + 1, min(row + 3, ROWS), 1, piece.color, left))
                 moves.update(self._traverse_right(row + 1, min(row + 3, ROWS), 1, piece.color, right))
-
             if piece.color == RED or piece.king:
                 moves.update(self._traverse_left(row - 1, max(row - 3, -1), -1, piece.color, left))
                 moves.update(self._traverse_right(row - 1, max(row - 3, -1), -1, piece.color, right))
-
         return moves
 
-    def _traverse_diagonal(self, start_row, start_col, row_step, col_step, color, skipped=[]):
+    def _traverse_diagonal(self, start_row, start_col, row_step, col_step, color, skipped=None):
         moves = {}
         last = []
         row, col = start_row + row_step, start_col + col_step
-
         while 0 <= row < ROWS and 0 <= col < COLS:
             current = self.board[row][col]
             if current == 0:
@@ -130,7 +215,6 @@ class Board:
                     moves[(row, col)] = last + skipped
                 else:
                     moves[(row, col)] = last
-
                 if last:
                     new_row = row + row_step
                     new_col = col + col_step
@@ -140,19 +224,16 @@ class Board:
                 break
             else:
                 last = [current]
-
             row += row_step
             col += col_step
-
         return moves
 
-    def _traverse_left(self, start, stop, step, color, left, skipped=[]):
+    def _traverse_left(self, start, stop, step, color, left, skipped=None):
         moves = {}
         last = []
         for r in range(start, stop, step):
             if left < 0:
                 break
-
             current = self.board[r][left]
             if current == 0:
                 if skipped and not last:
@@ -161,7 +242,6 @@ class Board:
                     moves[(r, left)] = last + skipped
                 else:
                     moves[(r, left)] = last
-
                 if last:
                     row = r + step
                     col = left - 1
@@ -173,18 +253,15 @@ class Board:
                 break
             else:
                 last = [current]
-
             left -= 1
-
         return moves
 
-    def _traverse_right(self, start, stop, step, color, right, skipped=[]):
+    def _traverse_right(self, start, stop, step, color, right, skipped=None):
         moves = {}
         last = []
         for r in range(start, stop, step):
             if right >= COLS:
                 break
-
             current = self.board[r][right]
             if current == 0:
                 if skipped and not last:
@@ -193,7 +270,6 @@ class Board:
                     moves[(r, right)] = last + skipped
                 else:
                     moves[(r, right)] = last
-
                 if last:
                     row = r + step
                     col = right - 1
@@ -205,7 +281,13 @@ class Board:
                 break
             else:
                 last = [current]
-
             right += 1
-
         return moves
+
+
+def get_all_moves(board, color):
+    moves = []
+    for piece in board.get_all_pieces(color):
+        for move, skip in board.get_valid_moves(piece).items():
+            moves.append((piece, move[0], move[1], skip))
+    return moves
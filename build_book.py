@@ -0,0 +1,55 @@
+import argparse
+import os
+import sys
+import time
+
+from engine import MoveOrdering, SearchContext, TranspositionTable, iterative_deepening
+from engine.book import build_book, write_book
+
+# Genera el libro de aperturas con búsquedas profundas de las primeras plies:
+#
+#   python build_book.py --plies 8 --depth 10
+#
+# En los turnos del libro se guarda y se sigue el mejor movimiento; en los
+# del rival se recorren todas las respuestas. Se generan los dos colores y
+# las dos posibilidades de quién empieza, porque en main.py mueven primero
+# las rojas.
+
+# Por defecto se escribe junto a este script, donde lo busca main.py
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera el libro de aperturas")
+    parser.add_argument("--plies", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=10)
+    parser.add_argument("--tt-size", type=int, default=64, help="MB de la tabla de transposición")
+    parser.add_argument("--output", default=os.path.join(BASE_DIR, "opening_book.bin"))
+    args = parser.parse_args(argv)
+
+    transposition_table = TranspositionTable(args.tt_size)
+    ordering = MoveOrdering()
+    start = time.perf_counter()
+
+    def search(position, white):
+        transposition_table.new_search()
+        ordering.new_search()
+        context = SearchContext(transposition_table, ordering=ordering)
+        score, move = iterative_deepening(position, white, float('inf'), context, args.depth)
+        return score, move, context.depth
+
+    def progress(count):
+        if count % 100 == 0:
+            print(f"{count:>6} posiciones  {time.perf_counter() - start:8.1f}s", flush=True)
+
+    entries = {}
+    for book_white in (True, False):
+        for first_white in (True, False):
+            build_book(search, args.plies, book_white, first_white, entries, progress)
+    write_book(args.output, entries)
+    print(f"{len(entries)} posiciones en {args.output}  {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
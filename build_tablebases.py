@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+import time
+
+from engine.tablebase import DRAW, LOSS, WIN, decode, generate
+
+# Genera las tablas de finales que usa la búsqueda:
+#
+#   python build_tablebases.py --pieces 5
+#
+# El generador es Python puro: hasta 4 piezas tarda minutos, 5 piezas unas
+# horas y 6 piezas un par de días. En memoria solo está la tabla que se
+# genera, con unos cuatro bytes por posición: la mayor de 6 piezas necesita
+# algo más de 1 GB. Las tablas ya generadas se reutilizan, así que se puede
+# ampliar un directorio con un --pieces mayor.
+
+# Por defecto se escriben junto a este script, donde las busca main.py
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera las tablas de finales")
+    parser.add_argument("--pieces", type=int, default=5)
+    parser.add_argument("--dir", default=os.path.join(BASE_DIR, "tablebases"))
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+
+    def progress(material, values):
+        # Se cuenta cada valor posible de una vez: recorrer byte a byte una
+        # tabla de cientos de millones de posiciones tardaría minutos
+        counts = {WIN: 0, LOSS: 0, DRAW: 0}
+        longest = 0
+        for value in range(1, 256):
+            count = values.count(value)
+            if count:
+                result, distance = decode(value)
+                counts[result] += count
+                longest = max(longest, distance)
+        print(f"{material}  ganadas {counts[WIN]:>8}  perdidas {counts[LOSS]:>8}  tablas {counts[DRAW]:>8}  "
+              f"más larga {longest:>3}  {time.perf_counter() - start:8.1f}s", flush=True)
+
+    generate(args.dir, args.pieces, progress)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
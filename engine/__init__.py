@@ -0,0 +1,12 @@
+# Motor de damas sin dependencias gráficas: reglas y generación de movimientos
+# sobre bitboards, evaluación y búsqueda. No importa pygame, networkx ni
+# matplotlib, así que puede usarse en procesos sin pantalla.
+
+from .bitboard import Position, from_square, to_square
+from .book import OpeningBook
+from .ordering import MoveOrdering
+from .search import MAX_DEPTH, WIN_SCORE, SearchContext, SearchTimeout, iterative_deepening, minimax
+from .stats import SearchStats
+from .tablebase import Tablebase
+from .tracing import CountingTracer, NullTracer, TreeRecorder
+from .transposition import TranspositionTable
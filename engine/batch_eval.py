@@ -0,0 +1,132 @@
+import numpy as np
+
+from .bitboard import EDGES, EVEN_ROWS, LEFT_EDGE, ODD_ROWS, RIGHT_EDGE, SQUARE_VALUES
+
+# Evaluación de muchas posiciones a la vez con NumPy. Cada posición es una
+# fila de cuatro bitboards uint32 (hombres blancos, damas blancas, hombres
+# rojos, damas rojas) y todos los términos se calculan sobre columnas enteras:
+#
+#   - material, damas, avance y bordes: los mismos valores por casilla que
+#     Position.evaluate, sumados por bytes con tablas de 256 entradas
+#   - movilidad y capturas (heuristica.txt, punto 3): movimientos de cada
+#     jugador y cuántos de ellos capturan. De las capturas encadenadas de las
+#     damas solo se cuenta la primera.
+#   - protección (punto 4): piezas en un borde o con una pieza propia detrás
+#
+# NumPy solo se necesita para este módulo; el resto del motor no lo importa.
+
+# Pesos en décimas de punto, como SQUARE_VALUES
+MOBILITY_WEIGHT = 1
+CAPTURE_WEIGHT = 3
+PROTECTION_WEIGHT = 2
+
+_EVEN_ROWS = np.uint32(EVEN_ROWS)
+_ODD_ROWS = np.uint32(ODD_ROWS)
+_EVEN_NOT_RIGHT = np.uint32(EVEN_ROWS & ~RIGHT_EDGE)
+_ODD_NOT_LEFT = np.uint32(ODD_ROWS & ~LEFT_EDGE)
+_EDGES = np.uint32(EDGES)
+
+
+# Los mismos desplazamientos que en bitboard.py; con uint32 los bits que
+# salen por arriba se pierden solos
+def _down_left(bb):
+    return (bb & _EVEN_ROWS) << 4 | (bb & _ODD_NOT_LEFT) << 3
+
+
+def _down_right(bb):
+    return (bb & _EVEN_NOT_RIGHT) << 5 | (bb & _ODD_ROWS) << 4
+
+
+def _up_left(bb):
+    return (bb & _EVEN_ROWS) >> 4 | (bb & _ODD_NOT_LEFT) >> 5
+
+
+def _up_right(bb):
+    return (bb & _EVEN_NOT_RIGHT) >> 3 | (bb & _ODD_ROWS) >> 4
+
+
+_WHITE_FORWARD = (_down_left, _down_right)
+_RED_FORWARD = (_up_left, _up_right)
+_KING_STEPS = (_up_left, _up_right, _down_left, _down_right)
+
+# Valor de cada byte de cada bitboard: _BYTE_VALUES[tipo, byte, valor]
+_BYTE_VALUES = np.zeros((4, 4, 256), np.int32)
+for _kind in range(4):
+    for _byte in range(4):
+        for _bit in range(8):
+            _set = (np.arange(256) >> _bit & 1).astype(bool)
+            _BYTE_VALUES[_kind, _byte, _set] += SQUARE_VALUES[_kind][8 * _byte + _bit]
+
+
+def pack_positions(positions):
+    boards = np.empty((len(positions), 4), np.uint32)
+    for row, position in enumerate(positions):
+        boards[row] = (position.white_men, position.white_kings, position.red_men, position.red_kings)
+    return boards
+
+
+def material_scores(boards):
+    # Suma de SQUARE_VALUES, en décimas: igual que Position.score
+    scores = np.zeros(len(boards), np.int32)
+    for kind in range(4):
+        column = boards[:, kind]
+        for byte in range(4):
+            scores += _BYTE_VALUES[kind, byte][column >> (8 * byte) & 0xFF]
+    return scores
+
+
+def move_counts(men, kings, enemy, empty, forward):
+    # Devuelve (movimientos, capturas) de un jugador en cada posición
+    moves = np.zeros(len(men), np.int32)
+    captures = np.zeros(len(men), np.int32)
+    for step in forward:
+        moves += np.bitwise_count(step(men) & empty)
+        captures += np.bitwise_count(step(step(men) & enemy) & empty)
+    for step in _KING_STEPS:
+        moves += np.bitwise_count(step(kings) & empty)
+        # Una dama captura tras una fila de piezas rivales seguida de una casilla vacía
+        run = step(kings) & enemy
+        while run.any():
+            run = step(run)
+            captures += np.bitwise_count(run & empty)
+            run &= enemy
+    return moves + captures, captures
+
+
+def protected_counts(pieces, behind):
+    return np.bitwise_count(pieces & (_EDGES | behind[0](pieces) | behind[1](pieces)))
+
+
+class BatchEvaluator:
+    def __init__(self, mobility_weight=MOBILITY_WEIGHT, capture_weight=CAPTURE_WEIGHT,
+                 protection_weight=PROTECTION_WEIGHT):
+        self.mobility_weight = mobility_weight
+        self.capture_weight = capture_weight
+        self.protection_weight = protection_weight
+        self.positions = 0
+
+    def evaluate(self, boards, white):
+        # Devuelve (puntuaciones, movimientos del jugador al que le toca). Las
+        # puntuaciones van en puntos, positivas para las blancas; una posición
+        # sin movimientos para el que mueve es una derrota y la puntúa quien llama.
+        boards = np.asarray(boards, np.uint32).reshape(-1, 4)
+        self.positions += len(boards)
+        white_men, white_kings, red_men, red_kings = boards.T
+        white_pieces = white_men | white_kings
+        red_pieces = red_men | red_kings
+        empty = ~(white_pieces | red_pieces)
+
+        # En float64 para admitir pesos fraccionarios (ajuste de pesos); con
+        # pesos enteros las sumas siguen siendo exactas
+        scores = material_scores(boards).astype(np.float64)
+        white_moves, white_captures = move_counts(white_men, white_kings, red_pieces, empty, _WHITE_FORWARD)
+        red_moves, red_captures = move_counts(red_men, red_kings, white_pieces, empty, _RED_FORWARD)
+        if self.mobility_weight:
+            scores += self.mobility_weight * (white_moves - red_moves)
+        if self.capture_weight:
+            scores += self.capture_weight * (white_captures - red_captures)
+        if self.protection_weight:
+            # Detrás de una pieza blanca está la fila anterior; de una roja, la siguiente
+            scores += self.protection_weight * (protected_counts(white_pieces, (_down_left, _down_right))
+                                                - protected_counts(red_pieces, (_up_left, _up_right)))
+        return scores / 10, white_moves if white else red_moves
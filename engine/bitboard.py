@@ -0,0 +1,323 @@
+# Representación compacta de una posición para el motor de búsqueda.
+#
+# Solo se usan las 32 casillas oscuras del tablero, numeradas por filas:
+# casilla = fila * 4 + columna // 2. Cada conjunto de piezas (hombres y damas
+# de cada color) es un entero de 32 bits con un bit por casilla, y los
+# movimientos se generan con desplazamientos y máscaras.
+
+from .zobrist import PIECE_KEYS, WHITE_MAN, WHITE_KING, RED_MAN, RED_KING, hash_masks
+
+ROWS, COLS = 8, 8
+FULL = 0xFFFFFFFF
+
+ROW_MASKS = [0xF << (4 * row) for row in range(ROWS)]
+EVEN_ROWS = sum(ROW_MASKS[row] for row in range(0, ROWS, 2))
+ODD_ROWS = FULL ^ EVEN_ROWS
+
+# En las filas pares las casillas oscuras están en las columnas 1, 3, 5 y 7;
+# en las impares en las columnas 0, 2, 4 y 6.
+LEFT_EDGE = sum(1 << (4 * row) for row in range(1, ROWS, 2))
+RIGHT_EDGE = sum(1 << (4 * row + 3) for row in range(0, ROWS, 2))
+EDGES = LEFT_EDGE | RIGHT_EDGE
+
+WHITE_START = ROW_MASKS[0] | ROW_MASKS[1] | ROW_MASKS[2]
+RED_START = ROW_MASKS[5] | ROW_MASKS[6] | ROW_MASKS[7]
+
+# Las blancas coronan en la última fila y las rojas en la primera
+WHITE_KING_ROW = ROW_MASKS[ROWS - 1]
+RED_KING_ROW = ROW_MASKS[0]
+
+
+# Valor de cada tipo de pieza en cada casilla, en décimas de punto y con signo
+# (positivo para las blancas): 1 punto por pieza, 1.8 más por dama, 0.1 por
+# fila avanzada y 0.2 en las columnas de los bordes. La evaluación de una
+# posición es la suma de los valores de sus piezas.
+KING_BONUS = 18
+
+
+def _square_value(square, white, king):
+    row = square // 4
+    value = 10 + (row if white else ROWS - row - 1)
+    if (LEFT_EDGE | RIGHT_EDGE) >> square & 1:
+        value += 2
+    if king:
+        value += KING_BONUS
+    return value if white else -value
+
+
+SQUARE_VALUES = [[_square_value(square, white, king) for square in range(32)]
+                 for white, king in ((True, False), (True, True), (False, False), (False, True))]
+
+
+def masks_score(*masks):
+    score = 0
+    for kind, mask in enumerate(masks):
+        values = SQUARE_VALUES[kind]
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            score += values[bit.bit_length() - 1]
+    return score
+
+
+def to_square(row, col):
+    return row * 4 + col // 2
+
+
+def from_square(square):
+    row = square // 4
+    return row, (square % 4) * 2 + (row + 1) % 2
+
+
+def shift_down_left(bb):  # (fila + 1, columna - 1)
+    return ((bb & EVEN_ROWS) << 4 | (bb & ODD_ROWS & ~LEFT_EDGE) << 3) & FULL
+
+
+def shift_down_right(bb):  # (fila + 1, columna + 1)
+    return ((bb & EVEN_ROWS & ~RIGHT_EDGE) << 5 | (bb & ODD_ROWS) << 4) & FULL
+
+
+def shift_up_left(bb):  # (fila - 1, columna - 1)
+    return (bb & EVEN_ROWS) >> 4 | (bb & ODD_ROWS & ~LEFT_EDGE) >> 5
+
+
+def shift_up_right(bb):  # (fila - 1, columna + 1)
+    return (bb & EVEN_ROWS & ~RIGHT_EDGE) >> 3 | (bb & ODD_ROWS) >> 4
+
+
+# Pares (avance, retroceso) por dirección
+WHITE_DIRECTIONS = ((shift_down_left, shift_up_right), (shift_down_right, shift_up_left))
+RED_DIRECTIONS = ((shift_up_left, shift_down_right), (shift_up_right, shift_down_left))
+KING_DIRECTIONS = (shift_up_left, shift_up_right, shift_down_left, shift_down_right)
+
+
+def bit_square(bit):
+    return bit.bit_length() - 1
+
+
+def _ray(square, row_step, col_step):
+    row, col = from_square(square)
+    squares = []
+    while 0 <= row + row_step < ROWS and 0 <= col + col_step < COLS:
+        row, col = row + row_step, col + col_step
+        squares.append(to_square(row, col))
+    return tuple(squares)
+
+
+# Diagonales de cada casilla, calculadas una vez: KING_RAYS[casilla] tiene las
+# cuatro direcciones en el orden de KING_DIRECTIONS y cada una es la tupla de
+# casillas hasta el borde. ray[0] es la casilla vecina y ray[1] la de aterrizaje
+# al saltarla.
+KING_RAYS = [tuple(_ray(square, row_step, col_step) for row_step, col_step in ((-1, -1), (-1, 1), (1, -1), (1, 1)))
+             for square in range(32)]
+SQUARE_BITS = [1 << square for square in range(32)]
+
+
+def king_ray(origin, ray, enemy, empty, moves):
+    # Misma exploración que Board._traverse_diagonal, sin recursión: recorre la
+    # diagonal recordando la última pieza rival y, tras una captura, sigue
+    # buscando otra en la misma dirección saltándose la casilla siguiente. La
+    # cadena no cambia de diagonal, así que basta con la posición en la tupla
+    # y la captura anterior.
+    last = skipped = 0
+    index = 0
+    length = len(ray)
+    while index < length:
+        square = ray[index]
+        bit = SQUARE_BITS[square]
+        if bit & empty:
+            if skipped and not last:
+                break
+            moves.append((origin, square, last | skipped))
+            if not last:
+                break
+            skipped, last = last, 0
+            index += 2
+        elif bit & enemy:
+            last = bit
+            index += 1
+        else:
+            break
+
+
+class Position:
+    __slots__ = ("white_men", "white_kings", "red_men", "red_kings", "key", "score")
+
+    def __init__(self, white_men=WHITE_START, white_kings=0, red_men=RED_START, red_kings=0):
+        self.white_men = white_men
+        self.white_kings = white_kings
+        self.red_men = red_men
+        self.red_kings = red_kings
+        self.key = hash_masks(white_men, white_kings, red_men, red_kings)
+        self.score = masks_score(white_men, white_kings, red_men, red_kings)
+
+    def copy(self):
+        position = Position.__new__(Position)
+        position.white_men = self.white_men
+        position.white_kings = self.white_kings
+        position.red_men = self.red_men
+        position.red_kings = self.red_kings
+        position.key = self.key
+        position.score = self.score
+        return position
+
+    def white(self):
+        return self.white_men | self.white_kings
+
+    def red(self):
+        return self.red_men | self.red_kings
+
+    def empty(self):
+        return FULL ^ (self.white_men | self.white_kings | self.red_men | self.red_kings)
+
+    def get_all_moves(self, white):
+        # Cada movimiento es una tupla (origen, destino, máscara de capturadas)
+        if white:
+            men, kings, enemy, directions = self.white_men, self.white_kings, self.red(), WHITE_DIRECTIONS
+        else:
+            men, kings, enemy, directions = self.red_men, self.red_kings, self.white(), RED_DIRECTIONS
+        empty = self.empty()
+        moves = []
+
+        for forward, back in directions:
+            targets = forward(men) & empty
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                moves.append((bit_square(back(bit)), bit_square(bit), 0))
+
+            targets = forward(forward(men) & enemy) & empty
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                captured = back(bit)
+                moves.append((bit_square(back(captured)), bit_square(bit), captured))
+
+        while kings:
+            king = kings & -kings
+            kings ^= king
+            origin = bit_square(king)
+            for ray in KING_RAYS[origin]:
+                king_ray(origin, ray, enemy, empty, moves)
+
+        return moves
+
+    def get_captures(self, white):
+        # Solo los movimientos que capturan, en el mismo formato que get_all_moves
+        if white:
+            men, kings, enemy, directions = self.white_men, self.white_kings, self.red(), WHITE_DIRECTIONS
+        else:
+            men, kings, enemy, directions = self.red_men, self.red_kings, self.white(), RED_DIRECTIONS
+        empty = self.empty()
+        moves = []
+
+        for forward, back in directions:
+            targets = forward(forward(men) & enemy) & empty
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                captured = back(bit)
+                moves.append((bit_square(back(captured)), bit_square(bit), captured))
+
+        while kings:
+            king = kings & -kings
+            kings ^= king
+            origin = bit_square(king)
+            for ray in KING_RAYS[origin]:
+                # Con una pieza rival al lado la exploración solo encuentra capturas
+                if ray and SQUARE_BITS[ray[0]] & enemy:
+                    king_ray(origin, ray, enemy, empty, moves)
+
+        return moves
+
+    def make(self, move):
+        # Aplica el movimiento sobre esta misma posición y devuelve el registro
+        # necesario para deshacerlo con unmake. La clave Zobrist y la
+        # puntuación se actualizan con las piezas que cambian.
+        undo = (self.white_men, self.white_kings, self.red_men, self.red_kings, self.key, self.score)
+        origin, target, captured = move
+        from_bit, to_bit = 1 << origin, 1 << target
+
+        if self.white_men & from_bit:
+            kind = WHITE_MAN
+            self.white_men ^= from_bit
+            if to_bit & WHITE_KING_ROW:
+                new_kind = WHITE_KING
+                self.white_kings |= to_bit
+            else:
+                new_kind = WHITE_MAN
+                self.white_men |= to_bit
+        elif self.white_kings & from_bit:
+            kind = new_kind = WHITE_KING
+            self.white_kings ^= from_bit | to_bit
+        elif self.red_men & from_bit:
+            kind = RED_MAN
+            self.red_men ^= from_bit
+            if to_bit & RED_KING_ROW:
+                new_kind = RED_KING
+                self.red_kings |= to_bit
+            else:
+                new_kind = RED_MAN
+                self.red_men |= to_bit
+        else:
+            kind = new_kind = RED_KING
+            self.red_kings ^= from_bit | to_bit
+        self.key ^= PIECE_KEYS[kind][origin] ^ PIECE_KEYS[new_kind][target]
+        self.score += SQUARE_VALUES[new_kind][target] - SQUARE_VALUES[kind][origin]
+
+        while captured:
+            bit = captured & -captured
+            captured ^= bit
+            if self.white_men & bit:
+                kind = WHITE_MAN
+                self.white_men ^= bit
+            elif self.white_kings & bit:
+                kind = WHITE_KING
+                self.white_kings ^= bit
+            elif self.red_men & bit:
+                kind = RED_MAN
+                self.red_men ^= bit
+            else:
+                kind = RED_KING
+                self.red_kings ^= bit
+            square = bit.bit_length() - 1
+            self.key ^= PIECE_KEYS[kind][square]
+            self.score -= SQUARE_VALUES[kind][square]
+
+        return undo
+
+    def unmake(self, undo):
+        self.white_men, self.white_kings, self.red_men, self.red_kings, self.key, self.score = undo
+
+    def has_any_move(self, white):
+        # Comprobación rápida con vecinos desplazados: se detiene en cuanto
+        # encuentra un movimiento, sin generar la lista
+        if white:
+            men, kings, enemy, directions = self.white_men, self.white_kings, self.red(), WHITE_DIRECTIONS
+        else:
+            men, kings, enemy, directions = self.red_men, self.red_kings, self.white(), RED_DIRECTIONS
+        empty = self.empty()
+
+        for forward, _ in directions:
+            if forward(men) & empty or forward(forward(men) & enemy) & empty:
+                return True
+
+        if kings:
+            for step in KING_DIRECTIONS:
+                if step(kings) & empty:
+                    return True
+                # Una dama captura tras una fila de piezas rivales seguida de una casilla vacía
+                run = step(kings) & enemy
+                while run:
+                    run = step(run)
+                    if run & empty:
+                        return True
+                    run &= enemy
+        return False
+
+    def is_game_over(self, white):
+        # Termina cuando el jugador al que le toca no puede mover (o no tiene piezas)
+        return not self.has_any_move(white)
+
+    def evaluate(self):
+        return self.score / 10
@@ -0,0 +1,103 @@
+import mmap
+import os
+import struct
+
+from . import zobrist
+from .bitboard import Position
+from .transposition import pack_move, unpack_move
+
+# Libro de aperturas: un fichero binario con una entrada por posición,
+# ordenado por clave Zobrist (con el turno, igual que en la tabla de
+# transposición). Se abre con mmap y se consulta con búsqueda binaria, así
+# que no hay que cargarlo entero.
+#
+# Cada entrada guarda la clave, el movimiento empaquetado, la puntuación de
+# la búsqueda en décimas y la profundidad con la que se calculó.
+ENTRY = struct.Struct("<QQhH")
+
+
+def book_key(position, white):
+    return position.key if white else position.key ^ zobrist.SIDE_KEY
+
+
+class OpeningBook:
+    def __init__(self, path):
+        self.path = path
+        self.data = None
+        self.size = 0
+        self.probes = 0
+        self.hits = 0
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, "rb") as file:
+                self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.size = len(self.data) // ENTRY.size
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+            self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def probe(self, position, white):
+        # Devuelve (puntuación, movimiento) o None si la posición no está
+        if not self.size:
+            return None
+        self.probes += 1
+        key = book_key(position, white)
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if struct.unpack_from("<Q", self.data, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.size:
+            return None
+        entry_key, packed, score, _ = ENTRY.unpack_from(self.data, low * ENTRY.size)
+        move = unpack_move(packed)
+        # Una colisión de claves no puede devolver un movimiento ilegal
+        if entry_key != key or move not in position.get_all_moves(white):
+            return None
+        self.hits += 1
+        return score / 10, move
+
+
+def write_book(path, entries):
+    # entries: clave -> (puntuación, movimiento, profundidad)
+    with open(path + ".tmp", "wb") as file:
+        for key in sorted(entries):
+            score, move, depth = entries[key]
+            file.write(ENTRY.pack(key, pack_move(move), round(score * 10), depth))
+    os.replace(path + ".tmp", path)
+
+
+def build_book(search, plies, book_white, first_white, entries, progress=None, position=None):
+    # Recorre las primeras plies desde la posición inicial. En los turnos del
+    # libro solo se sigue el movimiento elegido por search(position, white) ->
+    # (puntuación, movimiento, profundidad); en los del rival, todas las respuestas.
+    position = Position() if position is None else position.copy()
+    visited = set()
+
+    def visit(white, ply):
+        key = book_key(position, white)
+        if ply == plies or key in visited:
+            return
+        visited.add(key)
+        if white == book_white:
+            if key not in entries:
+                entries[key] = search(position, white)
+                if progress is not None:
+                    progress(len(entries))
+            moves = [entries[key][1]] if entries[key][1] is not None else []
+        else:
+            moves = position.get_all_moves(white)
+        for move in moves:
+            undo = position.make(move)
+            visit(not white, ply + 1)
+            position.unmake(undo)
+
+    visit(first_white, 0)
+    return entries
@@ -0,0 +1,70 @@
+# Ordenación de movimientos para que los cortes alfa-beta lleguen antes:
+# primero el movimiento de la tabla de transposición, luego las capturas (las
+# que comen más piezas primero), después los movimientos asesinos de ese ply
+# y por último los movimientos tranquilos según la tabla de historia.
+
+MAX_PLY = 128
+
+HASH_MOVE = 1 << 62
+CAPTURE = 1 << 61
+KILLER = 1 << 60
+# Por encima de este valor la historia se reduce a la mitad
+HISTORY_LIMIT = 1 << 40
+
+
+class MoveOrdering:
+    def __init__(self):
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [[0] * 32 for _ in range(32)]
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def new_search(self):
+        # Los asesinos dependen del ply, así que no sirven de una búsqueda a
+        # otra; la historia se conserva pero pierde peso
+        for killers in self.killers:
+            killers[0] = killers[1] = None
+        for row in self.history:
+            for target in range(32):
+                row[target] >>= 1
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def order(self, moves, hash_move, ply):
+        killers = self.killers[ply] if ply < MAX_PLY else (None, None)
+        history = self.history
+
+        def score(move):
+            if move == hash_move:
+                return HASH_MOVE
+            if move[2]:
+                return CAPTURE + move[2].bit_count()
+            if move == killers[0]:
+                return KILLER + 1
+            if move == killers[1]:
+                return KILLER
+            return history[move[0]][move[1]]
+
+        moves.sort(key=score, reverse=True)
+        return moves
+
+    def record_cutoff(self, move, depth, ply, index):
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        if move[2]:
+            return
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        row = self.history[move[0]]
+        row[move[1]] += depth * depth
+        if row[move[1]] > HISTORY_LIMIT:
+            for row in self.history:
+                for target in range(32):
+                    row[target] >>= 1
+
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
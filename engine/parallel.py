@@ -0,0 +1,178 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .bitboard import Position
+from .ordering import MoveOrdering
+from .search import MAX_DEPTH, WIN_THRESHOLD, SearchContext, SearchTimeout, loss_score, minimax
+from .stats import SearchStats
+from .tablebase import Tablebase
+from .transposition import TranspositionTable
+
+# Búsqueda en paralelo repartiendo los movimientos de la raíz entre procesos.
+# El primer movimiento se busca solo con la ventana completa; los demás se
+# lanzan con la mejor puntuación conocida como cota, que se actualiza cada
+# vez que termina uno. El resultado es el mismo que el de minimax en serie a
+# profundidad fija: el primer movimiento, en el orden de la raíz, con la mejor
+# puntuación.
+
+# Las puntuaciones van en décimas: separar la cota media décima hace que un
+# movimiento que empata con el mejor devuelva su valor exacto y no solo una
+# cota, así el desempate por orden coincide con la búsqueda en serie.
+TIE_MARGIN = 0.05
+
+# Estado de cada proceso trabajador
+_worker = {}
+
+
+def _init_worker(tt_size_mb, tablebase_dir):
+    _worker["table"] = TranspositionTable(tt_size_mb)
+    # Cada proceso abre sus propios mmap; el sistema comparte las páginas
+    _worker["tablebase"] = Tablebase(tablebase_dir) if tablebase_dir is not None else None
+    _worker["search_id"] = None
+
+
+def _search_move(search_id, masks, move, depth, bound, max_player, time_left):
+    # Busca la posición tras un movimiento de la raíz. Devuelve (puntuación,
+    # exacta, estadísticas para SearchStats.add); la puntuación es None si se
+    # agotó el tiempo.
+    table = _worker["table"]
+    if _worker["search_id"] != search_id:
+        table.clear()
+        _worker["search_id"] = search_id
+    else:
+        table.new_search()
+
+    alpha, beta = float('-inf'), float('inf')
+    if bound is not None:
+        if max_player:
+            alpha = bound - TIE_MARGIN
+        else:
+            beta = bound + TIE_MARGIN
+
+    position = Position(*masks)
+    position.make(move)
+    context = SearchContext(table, tablebase=_worker["tablebase"])
+    if time_left is not None:
+        context.deadline = time.perf_counter() + time_left
+    try:
+        score, _ = minimax(position, depth - 1, alpha, beta, not max_player, context, 1)
+    except SearchTimeout:
+        score = None
+    context.stats.finish(context)
+    return score, score is not None and alpha < score < beta, context.stats.totals()
+
+
+class ParallelSearch:
+    def __init__(self, workers=None, tt_size_mb=16, start_method="spawn", tablebase_dir=None, book=None,
+                 on_iteration=None):
+        # "spawn" evita heredar el estado de pygame en los procesos hijos; en
+        # servidores sin pantalla "fork" arranca más rápido
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(start_method),
+                                            initializer=_init_worker, initargs=(tt_size_mb, tablebase_dir))
+        # El libro de aperturas se consulta en el proceso principal
+        self.book = book
+        self.search_id = 0
+        self.nodes = 0
+        self.depth = 0
+        self.stopped = False
+        # Estadísticas de la última búsqueda, sumadas de todos los procesos
+        # (la raíz se cuenta aquí), y función que recibe cada iteración
+        self.stats = SearchStats()
+        self.on_iteration = on_iteration
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def stop(self):
+        # Desde otro hilo: la búsqueda termina en cuanto acabe algún movimiento en curso
+        self.stopped = True
+
+    def root_moves(self, position, max_player):
+        # Mismo orden que usa minimax en la raíz con una búsqueda nueva
+        return MoveOrdering().order(position.get_all_moves(max_player), None, 0)
+
+    def search(self, position, depth, max_player):
+        self.search_id += 1
+        self.nodes = 0
+        self.stats = SearchStats()
+        result = self._search_root(position, depth, max_player, self.root_moves(position, max_player), None)
+        self.stats.end_iteration(depth, *result)
+        self.stats.finish()
+        return result
+
+    def iterative_deepening(self, position, max_player, time_limit, max_depth=MAX_DEPTH):
+        start = time.perf_counter()
+        self.search_id += 1
+        self.nodes = 0
+        self.depth = 0
+        self.stopped = False
+        self.stats = SearchStats()
+        if self.book is not None:
+            entry = self.book.probe(position, max_player)
+            if entry is not None:
+                self.stats.book = True
+                self.stats.finish()
+                return entry
+        moves = self.root_moves(position, max_player)
+        result = None, None
+        for depth in range(1, max_depth + 1):
+            deadline = start + time_limit if depth > 1 else None
+            try:
+                result = self._search_root(position, depth, max_player, moves, deadline)
+            except SearchTimeout:
+                break
+            self.depth = depth
+            iteration = self.stats.end_iteration(depth, *result)
+            if self.on_iteration is not None:
+                self.on_iteration(iteration)
+            if result[1] is not None:
+                moves.remove(result[1])
+                moves.insert(0, result[1])
+            if abs(result[0]) > WIN_THRESHOLD or time.perf_counter() - start >= time_limit or self.stopped:
+                break
+        self.stats.finish()
+        return result
+
+    def _search_root(self, position, depth, max_player, moves, deadline):
+        self.nodes += 1
+        self.stats.nodes[0] += 1
+        if not moves:
+            return loss_score(max_player, 0), None
+        masks = (position.white_men, position.white_kings, position.red_men, position.red_kings)
+        results = [None] * len(moves)
+        pending = {}
+        best = None
+
+        def submit(index):
+            time_left = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            future = self.executor.submit(_search_move, self.search_id, masks, moves[index], depth, best,
+                                          max_player, time_left)
+            pending[future] = index
+
+        # El primer movimiento va solo para tener una cota con la que lanzar el resto
+        submit(0)
+        next_index = 1
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                score, exact, totals = future.result()
+                self.nodes += sum(totals["nodes"])
+                self.stats.add(totals)
+                if score is None or self.stopped:
+                    for other in pending:
+                        other.cancel()
+                    raise SearchTimeout()
+                results[index] = score, exact
+                if exact and (best is None or (score > best if max_player else score < best)):
+                    best = score
+            while next_index < len(moves) and len(pending) < self.workers:
+                submit(next_index)
+                next_index += 1
+
+        for index, (score, exact) in enumerate(results):
+            if exact and score == best:
+                return best, moves[index]
@@ -0,0 +1,72 @@
+import threading
+import time
+
+from . import zobrist
+from .search import iterative_deepening
+
+# Búsqueda en el tiempo del rival. Tras mover, la IA toma de la tabla de
+# transposición la respuesta que espera y busca en un hilo la posición que
+# quedaría, con la misma tabla que la búsqueda normal. Si el rival juega esa
+# respuesta la búsqueda sigue y solo se le pone un límite de tiempo; si no,
+# se para y la tabla queda caliente para la búsqueda nueva.
+
+
+def predicted_reply(position, white, transposition_table):
+    # Mejor movimiento guardado para el que mueve en position
+    key = position.key if white else position.key ^ zobrist.SIDE_KEY
+    entry = transposition_table.probe(key)
+    if entry is None or entry[3] not in position.get_all_moves(white):
+        return None
+    return entry[3]
+
+
+class Ponder:
+    def __init__(self):
+        self.thread = None
+        self.context = None
+        self.position = None
+        self.white = None
+        self.start_time = 0.0
+        self.result = None
+        self.hits = 0
+        self.cancelled = 0
+
+    def start(self, position, white, context):
+        # position es la posición tras la respuesta prevista y white el que
+        # mueve en ella; context no debe usarse en otra búsqueda a la vez
+        self.stop()
+        self.position = position.copy()
+        self.white = white
+        self.context = context
+        self.result = None
+        self.start_time = time.perf_counter()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        self.result = iterative_deepening(self.position, self.white, float('inf'), self.context)
+
+    def active(self):
+        return self.thread is not None
+
+    def matches(self, position, white):
+        return (self.thread is not None and white == self.white and position.key == self.position.key
+                and position.white() == self.position.white() and position.red() == self.position.red())
+
+    def ponderhit(self, time_limit):
+        # El rival jugó lo previsto: la búsqueda cuenta desde que empezó a
+        # pensar, así que si ya lleva time_limit termina enseguida
+        self.hits += 1
+        self.context.stop(self.start_time + time_limit)
+        self.thread.join()
+        self.thread = None
+        return self.result
+
+    def stop(self):
+        # Cancela la búsqueda en curso y espera a que el hilo termine
+        if self.thread is None:
+            return
+        self.cancelled += 1
+        self.context.stop()
+        self.thread.join()
+        self.thread = None
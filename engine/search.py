@@ -0,0 +1,469 @@
+import time
+
+from . import zobrist
+from .bitboard import RED_KING_ROW, WHITE_KING_ROW
+from .ordering import MoveOrdering
+from .stats import CUTOFF_SLOTS, ProfiledPosition, SearchStats
+from .tablebase import DRAW, WIN
+from .tracing import NullTracer
+from .transposition import EXACT, LOWER, UPPER
+
+MAX_DEPTH = 50
+
+# Puntuación de una victoria. Se descuenta el ply para preferir las más
+# rápidas; en la tabla de transposición se guarda relativa al nodo.
+WIN_SCORE = 1000
+WIN_THRESHOLD = WIN_SCORE // 2
+
+# Las puntuaciones avanzan de décima en décima: una ventana de media décima
+# es la ventana nula de PVS
+NULL_WINDOW = 0.05
+# Ventana de aspiración alrededor de la puntuación de la iteración anterior;
+# se duplica por el lado que falla y tras MAX_ASPIRATION_FAILS fallos se
+# busca con la ventana completa
+ASPIRATION_WINDOW = 0.2
+MAX_ASPIRATION_FAILS = 3
+
+# Reducción de movimientos tardíos: los movimientos tranquilos a partir del
+# cuarto se buscan un ply menos y solo se repiten si mejoran la ventana
+LMR_MIN_DEPTH = 3
+LMR_MIN_INDEX = 3
+LMR_REDUCTION = 1
+# Poda de futilidad: margen por profundidad restante (1 y 2) para descartar
+# movimientos tranquilos cuando la evaluación estática no llega a la ventana
+FUTILITY_MARGINS = (0.5, 1.5)
+# ProbCut: una búsqueda PROBCUT_REDUCTION plies más corta que supera la
+# ventana por PROBCUT_MARGIN predice el corte de la búsqueda completa
+PROBCUT_MIN_DEPTH = 5
+PROBCUT_REDUCTION = 4
+PROBCUT_MARGIN = 1.0
+
+
+def score_to_tt(score, ply):
+    if score > WIN_THRESHOLD:
+        return score + ply
+    if score < -WIN_THRESHOLD:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    if score > WIN_THRESHOLD:
+        return score - ply
+    if score < -WIN_THRESHOLD:
+        return score + ply
+    return score
+
+
+def loss_score(max_player, ply):
+    # El jugador al que le toca no tiene movimientos: pierde
+    return -WIN_SCORE + ply if max_player else WIN_SCORE - ply
+
+
+def tablebase_score(result, distance, max_player, ply):
+    # La distancia de la tabla lleva al final de la partida, que se puntúa
+    # igual que si la búsqueda lo hubiera alcanzado
+    if result == DRAW:
+        return 0
+    if result == WIN:
+        return WIN_SCORE - ply - distance if max_player else -WIN_SCORE + ply + distance
+    return -WIN_SCORE + ply + distance if max_player else WIN_SCORE - ply - distance
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def evaluate_children(position, moves, max_player, context, ply):
+    # Evalúa de una vez todas las posiciones que dejan los movimientos. Con
+    # quiescencia, las que tienen capturas pendientes no se evalúan aquí: su
+    # puntuación queda en None y minimax las busca como las demás.
+    boards = []
+    pending = []
+    for index, move in enumerate(moves):
+        undo = position.make(move)
+        if context.quiescence and position.get_captures(not max_player):
+            pending.append(index)
+        else:
+            boards.append((position.white_men, position.white_kings, position.red_men, position.red_kings))
+        position.unmake(undo)
+    if not boards:
+        return [None] * len(moves)
+    context.nodes += len(boards)
+    stats = context.stats
+    stats.nodes[ply + 1] += len(boards)
+    stats.leaves[ply + 1] += len(boards)
+    start = time.perf_counter() if context.profile else 0.0
+    scores, replies = context.evaluator.evaluate(boards, not max_player)
+    if context.profile:
+        stats.eval_time += time.perf_counter() - start
+    loss = loss_score(not max_player, ply + 1)
+    leaf_scores = [score if count else loss for score, count in zip(scores.tolist(), replies.tolist())]
+    for index in pending:
+        leaf_scores.insert(index, None)
+    return leaf_scores
+
+
+def is_quiet(position, move):
+    # Ni captura ni corona
+    if move[2]:
+        return False
+    target = 1 << move[1]
+    if position.white_men >> move[0] & 1:
+        return not target & WHITE_KING_ROW
+    if position.red_men >> move[0] & 1:
+        return not target & RED_KING_ROW
+    return True
+
+
+class SearchContext:
+    def __init__(self, transposition_table=None, tracer=None, deadline=None, ordering=None, tablebase=None,
+                 book=None, evaluator=None, quiescence=True, pvs=False, lmr=False, futility=False,
+                 probcut=False, profile=False, on_iteration=None):
+        self.transposition_table = transposition_table
+        self.tablebase = tablebase
+        self.book = book
+        # Evaluador por lotes (engine.batch_eval) para los hijos de los nodos frontera
+        self.evaluator = evaluator
+        # Extender las capturas pendientes al llegar al horizonte
+        self.quiescence = quiescence
+        # Búsqueda de variante principal con ventanas de aspiración en lugar
+        # de alfa-beta con la ventana completa
+        self.pvs = pvs
+        # Reducciones y podas, cada una por separado
+        self.lmr = lmr
+        self.futility = futility
+        self.probcut = probcut
+        # Medir el tiempo de generación de movimientos y de evaluación (ver engine.stats)
+        self.profile = profile
+        # Función que recibe cada iteración terminada (un dict de SearchStats.iterations)
+        self.on_iteration = on_iteration
+        self.ordering = ordering if ordering is not None else MoveOrdering()
+        self.tracer = tracer if tracer is not None else NullTracer()
+        self.deadline = deadline
+        # Parada pedida desde otro hilo: inmediata o a partir de stop_time
+        self.stopped = False
+        self.stop_time = None
+        self.nodes = 0
+        self.tablebase_hits = 0
+        self.quiescence_nodes = 0
+        self.stand_pat_cutoffs = 0
+        self.pvs_researches = 0
+        self.aspiration_failures = 0
+        self.lmr_reductions = 0
+        self.lmr_researches = 0
+        self.futility_prunes = 0
+        self.probcut_tries = 0
+        self.probcut_cutoffs = 0
+        # Mejor movimiento de la última iteración completa, se prueba primero en la raíz
+        self.root_move = None
+        self.depth = 0
+        # Estadísticas de la última búsqueda; iterative_deepening pone unas nuevas
+        self.stats = SearchStats(transposition_table)
+
+    def stop(self, at=None):
+        if at is None:
+            self.stopped = True
+        else:
+            self.stop_time = at
+
+    def should_stop(self):
+        # Sin deadline (primera iteración) solo se atiende una parada inmediata
+        if self.stopped:
+            return True
+        if self.deadline is None:
+            return False
+        now = time.perf_counter()
+        return now > self.deadline or (self.stop_time is not None and now > self.stop_time)
+
+
+def minimax(position, depth, alpha, beta, max_player, context, ply=0, node_id=0):
+    context.nodes += 1
+    context.stats.nodes[ply] += 1
+    if context.nodes & 255 == 0 and context.should_stop():
+        raise SearchTimeout()
+
+    # Con pocas piezas la tabla de finales da el resultado exacto. En la raíz
+    # hay que buscar igualmente para elegir el movimiento.
+    if ply and context.tablebase is not None:
+        entry = context.tablebase.probe(position, max_player)
+        if entry is not None:
+            context.tablebase_hits += 1
+            return tablebase_score(entry[0], entry[1], max_player, ply), None
+
+    transposition_table = context.transposition_table
+    # La clave incluye el turno: la misma posición vale distinto según quién mueva
+    key = position.key if max_player else position.key ^ zobrist.SIDE_KEY
+    alpha_orig, beta_orig = alpha, beta
+    hash_move = None
+    if transposition_table is not None:
+        entry = transposition_table.probe(key)
+        if entry is not None:
+            entry_depth, flag, score, hash_move = entry
+            score = score_from_tt(score, ply)
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return score, hash_move
+                if flag == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    return score, hash_move
+
+    if depth == 0:
+        if context.quiescence:
+            score = quiescence(position, alpha, beta, max_player, context, ply)
+            flag = UPPER if score <= alpha else LOWER if score >= beta else EXACT
+        else:
+            context.stats.leaves[ply] += 1
+            score = position.evaluate() if position.has_any_move(max_player) else loss_score(max_player, ply)
+            flag = EXACT
+        if transposition_table is not None:
+            transposition_table.store(key, depth, flag, score_to_tt(score, ply), None)
+        return score, None
+
+    if context.probcut and ply and depth >= PROBCUT_MIN_DEPTH:
+        score = probcut(position, depth, alpha, beta, max_player, context, ply, node_id)
+        if score is not None:
+            return score, None
+
+    moves = position.get_all_moves(max_player)
+    if not moves:
+        score = loss_score(max_player, ply)
+        if transposition_table is not None:
+            transposition_table.store(key, depth, EXACT, score_to_tt(score, ply), None)
+        return score, None
+    if ply == 0 and context.root_move is not None:
+        hash_move = context.root_move
+    context.ordering.order(moves, hash_move, ply)
+    tracer = context.tracer
+    leaf_scores = None
+    if depth == 1 and context.evaluator is not None and not tracer.enabled:
+        leaf_scores = evaluate_children(position, moves, max_player, context, ply)
+    # Cerca de las hojas, si ni con el margen la evaluación estática alcanza
+    # la ventana, los movimientos tranquilos no van a cambiar el resultado
+    futile = False
+    if context.futility and ply and depth <= len(FUTILITY_MARGINS) and leaf_scores is None:
+        margin = FUTILITY_MARGINS[depth - 1]
+        if max_player:
+            futile = abs(alpha) < WIN_THRESHOLD and position.evaluate() + margin <= alpha
+        else:
+            futile = abs(beta) < WIN_THRESHOLD and position.evaluate() - margin >= beta
+
+    if max_player:
+        best_eval = float('-inf')
+        best_move = None
+        for index, move in enumerate(moves):
+            quiet = (futile or context.lmr) and is_quiet(position, move)
+            if leaf_scores is not None and leaf_scores[index] is not None:
+                evaluation = leaf_scores[index]
+            elif futile and index and quiet:
+                context.futility_prunes += 1
+                continue
+            else:
+                undo = position.make(move)
+                child_id = tracer.child(node_id, move, ply + 1) if tracer.enabled else 0
+                evaluation = search_move(position, depth, alpha, beta, max_player, context, ply, child_id,
+                                         index, quiet)
+                position.unmake(undo)
+                if tracer.enabled:
+                    tracer.score(child_id, evaluation)
+            if evaluation > best_eval:
+                best_eval = evaluation
+                best_move = move
+            alpha = max(alpha, evaluation)
+            if beta <= alpha:
+                context.ordering.record_cutoff(move, depth, ply, index)
+                context.stats.cutoffs[min(index, CUTOFF_SLOTS - 1)] += 1
+                break
+    else:
+        best_eval = float('inf')
+        best_move = None
+        for index, move in enumerate(moves):
+            quiet = (futile or context.lmr) and is_quiet(position, move)
+            if leaf_scores is not None and leaf_scores[index] is not None:
+                evaluation = leaf_scores[index]
+            elif futile and index and quiet:
+                context.futility_prunes += 1
+                continue
+            else:
+                undo = position.make(move)
+                child_id = tracer.child(node_id, move, ply + 1) if tracer.enabled else 0
+                evaluation = search_move(position, depth, alpha, beta, max_player, context, ply, child_id,
+                                         index, quiet)
+                position.unmake(undo)
+                if tracer.enabled:
+                    tracer.score(child_id, evaluation)
+            if evaluation < best_eval:
+                best_eval = evaluation
+                best_move = move
+            beta = min(beta, evaluation)
+            if beta <= alpha:
+                context.ordering.record_cutoff(move, depth, ply, index)
+                context.stats.cutoffs[min(index, CUTOFF_SLOTS - 1)] += 1
+                break
+
+    if transposition_table is not None:
+        if best_eval <= alpha_orig:
+            flag = UPPER
+        elif best_eval >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        transposition_table.store(key, depth, flag, score_to_tt(best_eval, ply), best_move)
+    return best_eval, best_move
+
+
+def search_move(position, depth, alpha, beta, max_player, context, ply, child_id, index, quiet):
+    # Busca la posición que deja el movimiento index (ya hecho) y devuelve su
+    # evaluación. max_player es el jugador que ha movido.
+    if max_player:
+        null_alpha, null_beta = alpha, alpha + NULL_WINDOW
+    else:
+        null_alpha, null_beta = beta - NULL_WINDOW, beta
+
+    if context.lmr and quiet and index >= LMR_MIN_INDEX and depth >= LMR_MIN_DEPTH:
+        context.lmr_reductions += 1
+        evaluation, _ = minimax(position, depth - 1 - LMR_REDUCTION, null_alpha, null_beta, not max_player,
+                                context, ply + 1, child_id)
+        if (evaluation <= alpha) if max_player else (evaluation >= beta):
+            return evaluation
+        context.lmr_researches += 1
+
+    if context.pvs and index:
+        # Ventana nula: solo se comprueba si mejora al primer movimiento
+        evaluation, _ = minimax(position, depth - 1, null_alpha, null_beta, not max_player, context, ply + 1,
+                                child_id)
+        if not alpha < evaluation < beta:
+            return evaluation
+        context.pvs_researches += 1
+    evaluation, _ = minimax(position, depth - 1, alpha, beta, not max_player, context, ply + 1, child_id)
+    return evaluation
+
+
+def probcut(position, depth, alpha, beta, max_player, context, ply, node_id):
+    # Si una búsqueda reducida supera la ventana con margen, se supone que la
+    # completa también lo haría. Devuelve la puntuación del corte o None.
+    if max_player:
+        if beta >= WIN_THRESHOLD:
+            return None
+        bound = beta + PROBCUT_MARGIN
+        window = bound - NULL_WINDOW, bound
+    else:
+        if alpha <= -WIN_THRESHOLD:
+            return None
+        bound = alpha - PROBCUT_MARGIN
+        window = bound, bound + NULL_WINDOW
+    context.probcut_tries += 1
+    score, _ = minimax(position, depth - PROBCUT_REDUCTION, window[0], window[1], max_player, context, ply,
+                       node_id)
+    if (score >= bound) if max_player else (score <= bound):
+        context.probcut_cutoffs += 1
+        return score
+    return None
+
+
+def quiescence(position, alpha, beta, max_player, context, ply):
+    # Tras el horizonte solo se siguen las capturas hasta llegar a una
+    # posición tranquila. Capturar no es obligatorio, así que el que mueve
+    # puede quedarse con la evaluación estática (stand pat) si ya le basta.
+    context.quiescence_nodes += 1
+    stats = context.stats
+    stats.leaves[ply] += 1
+    if context.nodes & 255 == 0 and context.should_stop():
+        raise SearchTimeout()
+    if not position.has_any_move(max_player):
+        return loss_score(max_player, ply)
+
+    best_eval = position.evaluate()
+    if max_player:
+        if best_eval >= beta:
+            context.stand_pat_cutoffs += 1
+            return best_eval
+        alpha = max(alpha, best_eval)
+    else:
+        if best_eval <= alpha:
+            context.stand_pat_cutoffs += 1
+            return best_eval
+        beta = min(beta, best_eval)
+
+    captures = position.get_captures(max_player)
+    captures.sort(key=lambda move: move[2].bit_count(), reverse=True)
+    for move in captures:
+        context.nodes += 1
+        stats.nodes[ply + 1] += 1
+        undo = position.make(move)
+        evaluation = quiescence(position, alpha, beta, not max_player, context, ply + 1)
+        position.unmake(undo)
+        if max_player:
+            best_eval = max(best_eval, evaluation)
+            alpha = max(alpha, evaluation)
+        else:
+            best_eval = min(best_eval, evaluation)
+            beta = min(beta, evaluation)
+        if beta <= alpha:
+            break
+    return best_eval
+
+
+def aspiration_search(position, depth, previous, max_player, context, node_id):
+    # Busca con una ventana estrecha alrededor de la puntuación anterior y la
+    # ensancha por el lado que falle
+    low = high = ASPIRATION_WINDOW
+    for _ in range(MAX_ASPIRATION_FAILS):
+        alpha, beta = previous - low, previous + high
+        score, move = minimax(position, depth, alpha, beta, max_player, context, 0, node_id)
+        if score <= alpha:
+            low *= 2
+        elif score >= beta:
+            high *= 2
+        else:
+            return score, move
+        context.aspiration_failures += 1
+    return minimax(position, depth, float('-inf'), float('inf'), max_player, context, 0, node_id)
+
+
+def iterative_deepening(position, max_player, time_limit, context, max_depth=MAX_DEPTH):
+    # Profundiza de uno en uno hasta agotar el tiempo y devuelve el resultado
+    # de la última iteración completa. La primera siempre se termina para
+    # tener al menos un movimiento. Las posiciones del libro de aperturas no se buscan.
+    # Las estadísticas de la búsqueda quedan en context.stats.
+    stats = context.stats = SearchStats(context.transposition_table)
+    if context.book is not None:
+        entry = context.book.probe(position, max_player)
+        if entry is not None:
+            context.depth = 0
+            context.root_move = entry[1]
+            stats.book = True
+            stats.finish(context)
+            return entry
+    start = time.perf_counter()
+    position = ProfiledPosition.wrap(position, stats) if context.profile else position.copy()
+    result = None, None
+    context.root_move = None
+    for depth in range(1, max_depth + 1):
+        context.deadline = start + time_limit if depth > 1 else None
+        node_id = context.tracer.root(depth)
+        try:
+            if context.pvs and depth > 1 and abs(result[0]) < WIN_THRESHOLD:
+                result = aspiration_search(position, depth, result[0], max_player, context, node_id)
+            else:
+                result = minimax(position, depth, float('-inf'), float('inf'), max_player, context, 0, node_id)
+        except SearchTimeout:
+            break
+        context.tracer.score(node_id, result[0])
+        context.depth = depth
+        context.root_move = result[1]
+        iteration = stats.end_iteration(depth, result[0], result[1])
+        if context.on_iteration is not None:
+            context.on_iteration(iteration)
+        # Con una victoria o derrota forzada no hace falta seguir profundizando
+        now = time.perf_counter()
+        if abs(result[0]) > WIN_THRESHOLD or now - start >= time_limit or context.stopped:
+            break
+        if context.stop_time is not None and now >= context.stop_time:
+            break
+    context.deadline = None
+    stats.finish(context)
+    return result
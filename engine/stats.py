@@ -0,0 +1,181 @@
+import json
+import time
+
+from .bitboard import Position
+from .tracing import MAX_PLY
+
+# Estadísticas de una búsqueda, para medir el motor desde fuera (paneles,
+# banco de pruebas, registros). iterative_deepening deja un SearchStats nuevo
+# en context.stats en cada llamada:
+#
+#   - nodos y evaluaciones de hojas por ply
+#   - por iteración: nodos, tiempo, nodos por segundo y factor de
+#     ramificación efectivo (nodos de la iteración / nodos de la anterior)
+#   - histograma del índice del movimiento que produce cada corte beta
+#   - consultas, aciertos y escrituras de la tabla de transposición
+#   - los contadores de SearchContext (quiescencia, PVS, LMR, podas...)
+#   - con profile=True, el tiempo en generar movimientos y en evaluar
+#
+# SearchContext(on_iteration=...) recibe cada iteración según termina.
+# ParallelSearch suma en su propio SearchStats los de cada proceso (totals/add).
+
+# El último hueco del histograma agrupa los índices mayores
+CUTOFF_SLOTS = 16
+
+COUNTERS = ("tablebase_hits", "quiescence_nodes", "stand_pat_cutoffs", "pvs_researches", "aspiration_failures",
+            "lmr_reductions", "lmr_researches", "futility_prunes", "probcut_tries", "probcut_cutoffs")
+
+
+class SearchStats:
+    def __init__(self, transposition_table=None):
+        self.nodes = [0] * MAX_PLY
+        self.leaves = [0] * MAX_PLY
+        self.cutoffs = [0] * CUTOFF_SLOTS
+        self.iterations = []
+        self.movegen_time = 0.0
+        self.eval_time = 0.0
+        self.book = False
+        self.seconds = 0.0
+        self.counters = {}
+        self.transposition_table = transposition_table
+        self.start = time.perf_counter()
+        # Los contadores de la tabla son de toda la partida: se guarda el punto de partida
+        self.tt_start = self.tt_counts()
+        # Consultas, aciertos y escrituras sumados de otras tablas (procesos de ParallelSearch)
+        self.tt_added = [0, 0, 0]
+
+    def tt_counts(self):
+        table = self.transposition_table
+        if table is None:
+            return 0, 0, 0
+        return table.probes, table.hits, table.stores
+
+    def total_nodes(self):
+        return sum(self.nodes)
+
+    def end_iteration(self, depth, score, move):
+        elapsed = time.perf_counter() - self.start
+        nodes = self.total_nodes()
+        leaves = sum(self.leaves)
+        previous = self.iterations[-1] if self.iterations else None
+        iteration_nodes = nodes - previous["total_nodes"] if previous else nodes
+        iteration = {
+            "depth": depth,
+            "score": score,
+            "move": list(move) if move is not None else None,
+            "nodes": iteration_nodes,
+            "total_nodes": nodes,
+            "leaves": leaves - previous["total_leaves"] if previous else leaves,
+            "total_leaves": leaves,
+            "seconds": elapsed,
+            "nps": nodes / elapsed if elapsed > 0 else 0.0,
+            "ebf": iteration_nodes / previous["nodes"] if previous and previous["nodes"] else None,
+        }
+        self.iterations.append(iteration)
+        return iteration
+
+    def finish(self, context=None):
+        self.seconds = time.perf_counter() - self.start
+        if context is not None:
+            self.counters = {name: getattr(context, name) for name in COUNTERS}
+
+    def totals(self):
+        # Todo lo que se puede sumar entre búsquedas, en tipos simples para
+        # pasarlo entre procesos
+        return {
+            "nodes": self.nodes,
+            "leaves": self.leaves,
+            "cutoffs": self.cutoffs,
+            "movegen_time": self.movegen_time,
+            "eval_time": self.eval_time,
+            "tt": [now - start + added for now, start, added in zip(self.tt_counts(), self.tt_start, self.tt_added)],
+            "counters": self.counters,
+        }
+
+    def add(self, totals):
+        for ply, count in enumerate(totals["nodes"]):
+            self.nodes[ply] += count
+        for ply, count in enumerate(totals["leaves"]):
+            self.leaves[ply] += count
+        for index, count in enumerate(totals["cutoffs"]):
+            self.cutoffs[index] += count
+        self.movegen_time += totals["movegen_time"]
+        self.eval_time += totals["eval_time"]
+        for index, count in enumerate(totals["tt"]):
+            self.tt_added[index] += count
+        for name, count in totals["counters"].items():
+            self.counters[name] = self.counters.get(name, 0) + count
+
+    def tt_stats(self):
+        probes, hits, stores = (now - start + added
+                                for now, start, added in zip(self.tt_counts(), self.tt_start, self.tt_added))
+        return {"probes": probes, "hits": hits, "stores": stores, "hit_rate": hits / probes if probes else 0.0}
+
+    def to_dict(self):
+        nodes = self.total_nodes()
+        depth = len(self.nodes)
+        while depth and not self.nodes[depth - 1]:
+            depth -= 1
+        cutoffs = sum(self.cutoffs)
+        return {
+            "book": self.book,
+            "depth": self.iterations[-1]["depth"] if self.iterations else 0,
+            "nodes": nodes,
+            "seconds": self.seconds,
+            "nps": nodes / self.seconds if self.seconds > 0 else 0.0,
+            "nodes_per_ply": self.nodes[:depth],
+            "leaves_per_ply": self.leaves[:depth],
+            "cutoffs": self.cutoffs,
+            "first_move_cutoff_rate": self.cutoffs[0] / cutoffs if cutoffs else 0.0,
+            "transposition_table": self.tt_stats(),
+            "movegen_seconds": self.movegen_time,
+            "eval_seconds": self.eval_time,
+            "counters": self.counters,
+            "iterations": self.iterations,
+        }
+
+    def to_json(self, **options):
+        return json.dumps(self.to_dict(), **options)
+
+
+class ProfiledPosition(Position):
+    # Position que suma el tiempo de generar movimientos y de evaluar en un
+    # SearchStats. Solo se usa con SearchContext(profile=True): medir cada
+    # llamada cuesta más que algunas de ellas.
+    __slots__ = ("stats",)
+
+    @classmethod
+    def wrap(cls, position, stats):
+        profiled = cls.__new__(cls)
+        profiled.white_men = position.white_men
+        profiled.white_kings = position.white_kings
+        profiled.red_men = position.red_men
+        profiled.red_kings = position.red_kings
+        profiled.key = position.key
+        profiled.score = position.score
+        profiled.stats = stats
+        return profiled
+
+    def get_all_moves(self, white):
+        start = time.perf_counter()
+        moves = Position.get_all_moves(self, white)
+        self.stats.movegen_time += time.perf_counter() - start
+        return moves
+
+    def get_captures(self, white):
+        start = time.perf_counter()
+        moves = Position.get_captures(self, white)
+        self.stats.movegen_time += time.perf_counter() - start
+        return moves
+
+    def has_any_move(self, white):
+        start = time.perf_counter()
+        result = Position.has_any_move(self, white)
+        self.stats.movegen_time += time.perf_counter() - start
+        return result
+
+    def evaluate(self):
+        start = time.perf_counter()
+        score = Position.evaluate(self)
+        self.stats.eval_time += time.perf_counter() - start
+        return score
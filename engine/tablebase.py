@@ -0,0 +1,356 @@
+import mmap
+import os
+
+from .bitboard import (FULL, KING_DIRECTIONS, RED_DIRECTIONS, RED_KING_ROW, WHITE_DIRECTIONS, WHITE_KING_ROW,
+                       Position)
+
+# Tablas de finales generadas por análisis retrógrado. Hay un fichero por
+# material (hombres y damas de cada color) con un byte por posición y turno:
+#
+#   0       posición imposible (no se usa)
+#   1       tablas: ninguno de los dos puede forzar el final
+#   2 + d   el juego termina en d plies con juego perfecto; con d par pierde
+#           el que mueve (d = 0: no tiene movimientos) y con d impar gana
+#
+# El índice de una posición se calcula con el sistema combinatorio para cada
+# grupo de piezas, de modo que la consulta es una lectura directa del
+# fichero, que se abre con mmap la primera vez que se necesita.
+
+WIN, LOSS, DRAW = 1, 2, 3
+
+MAX_DISTANCE = 253
+DRAW_VALUE = 1
+
+# Un hombre nunca está en su fila de coronación
+WHITE_MEN_SQUARES = FULL ^ WHITE_KING_ROW
+RED_MEN_SQUARES = FULL ^ RED_KING_ROW
+
+BINOMIAL = [[0] * 33 for _ in range(33)]
+for _n in range(33):
+    BINOMIAL[_n][0] = 1
+    for _k in range(1, _n + 1):
+        BINOMIAL[_n][_k] = BINOMIAL[_n - 1][_k - 1] + BINOMIAL[_n - 1][_k]
+
+
+def signature(position):
+    return (position.white_men.bit_count(), position.white_kings.bit_count(),
+            position.red_men.bit_count(), position.red_kings.bit_count())
+
+
+def file_name(material):
+    return "{}{}{}{}.tb".format(*material)
+
+
+def group_sizes(material):
+    white_men, white_kings, red_men, red_kings = material
+    return (BINOMIAL[WHITE_MEN_SQUARES.bit_count()][white_men],
+            BINOMIAL[RED_MEN_SQUARES.bit_count()][red_men],
+            BINOMIAL[32 - white_men - red_men][white_kings],
+            BINOMIAL[32 - white_men - red_men - white_kings][red_kings])
+
+
+def table_size(material):
+    size = 2
+    for group in group_sizes(material):
+        size *= group
+    return size
+
+
+def _rank(mask, free):
+    # Posición de la combinación entre las casillas libres del grupo
+    rank = 0
+    count = 1
+    while mask:
+        bit = mask & -mask
+        mask ^= bit
+        rank += BINOMIAL[(free & (bit - 1)).bit_count()][count]
+        count += 1
+    return rank
+
+
+def _unrank(rank, count, free):
+    # Inversa de _rank: se recorren las casillas libres de la más alta a la
+    # más baja y se toma cada una cuyo número combinatorio cabe en el rango
+    mask = 0
+    top = free.bit_count()
+    while count:
+        bit = 1 << (free.bit_length() - 1)
+        free ^= bit
+        top -= 1
+        if BINOMIAL[top][count] <= rank:
+            rank -= BINOMIAL[top][count]
+            mask |= bit
+            count -= 1
+    return mask
+
+
+def _combinations(free, count):
+    # Todas las combinaciones de count casillas libres, en el orden de _rank
+    if not count:
+        return [0]
+    squares = [square for square in range(32) if free >> square & 1]
+    result = []
+    for top in range(count - 1, len(squares)):
+        bit = 1 << squares[top]
+        result.extend(mask | bit for mask in _combinations(free & (bit - 1), count - 1))
+    return result
+
+
+def masks_index(white_men, white_kings, red_men, red_kings, white, sizes):
+    index = _rank(white_men, WHITE_MEN_SQUARES)
+    index = index * sizes[1] + _rank(red_men, RED_MEN_SQUARES & ~white_men)
+    occupied = white_men | red_men
+    index = index * sizes[2] + _rank(white_kings, FULL ^ occupied)
+    occupied |= white_kings
+    index = index * sizes[3] + _rank(red_kings, FULL ^ occupied)
+    return index * 2 + (0 if white else 1)
+
+
+def position_index(position, white, sizes):
+    return masks_index(position.white_men, position.white_kings, position.red_men, position.red_kings, white, sizes)
+
+
+def index_masks(index, material, sizes):
+    # Inversa de masks_index: (hombres blancos, damas blancas, hombres rojos, damas rojas, turno)
+    index, side = divmod(index, 2)
+    index, red_kings = divmod(index, sizes[3])
+    index, white_kings = divmod(index, sizes[2])
+    white_men, red_men = divmod(index, sizes[1])
+    white_men = _unrank(white_men, material[0], WHITE_MEN_SQUARES)
+    red_men = _unrank(red_men, material[2], RED_MEN_SQUARES & ~white_men)
+    occupied = white_men | red_men
+    white_kings = _unrank(white_kings, material[1], FULL ^ occupied)
+    red_kings = _unrank(red_kings, material[3], FULL ^ (occupied | white_kings))
+    return white_men, white_kings, red_men, red_kings, side == 0
+
+
+def decode(value):
+    # Byte de la tabla -> (resultado para el que mueve, distancia en plies)
+    if value == DRAW_VALUE:
+        return DRAW, 0
+    distance = value - 2
+    return (LOSS if distance % 2 == 0 else WIN), distance
+
+
+class Tablebase:
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}
+        self.sizes = {}
+        self.probes = 0
+        self.hits = 0
+        # Las tablas disponibles se deducen de los nombres de fichero
+        self.max_pieces = 0
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                stem, extension = os.path.splitext(name)
+                if extension == ".tb" and len(stem) == 4 and stem.isdigit():
+                    self.max_pieces = max(self.max_pieces, sum(int(count) for count in stem))
+
+    def close(self):
+        for table in self.files.values():
+            if table is not None:
+                table.close()
+        self.files.clear()
+
+    def _table(self, material):
+        if material not in self.files:
+            path = os.path.join(self.directory, file_name(material))
+            table = None
+            if os.path.exists(path):
+                with open(path, "rb") as file:
+                    table = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.files[material] = table
+            self.sizes[material] = group_sizes(material)
+        return self.files[material]
+
+    def probe(self, position, white):
+        # Devuelve (resultado, distancia) para el que mueve, o None si no hay tabla
+        if (FULL ^ position.empty()).bit_count() > self.max_pieces:
+            return None
+        if position.white_men & WHITE_KING_ROW or position.red_men & RED_KING_ROW:
+            return None
+        self.probes += 1
+        material = signature(position)
+        table = self._table(material)
+        if table is None:
+            return None
+        value = table[position_index(position, white, self.sizes[material])]
+        if not value:
+            return None
+        self.hits += 1
+        return decode(value)
+
+
+def materials(max_pieces):
+    # Todos los materiales con piezas de los dos colores, en orden de
+    # generación: primero menos piezas y, con las mismas, menos hombres, porque
+    # las capturas y las coronaciones llevan a tablas ya generadas.
+    result = []
+    for total in range(2, max_pieces + 1):
+        for white_men in range(total + 1):
+            for white_kings in range(total - white_men + 1):
+                for red_men in range(total - white_men - white_kings + 1):
+                    red_kings = total - white_men - white_kings - red_men
+                    if white_men + white_kings and red_men + red_kings:
+                        result.append((white_men, white_kings, red_men, red_kings))
+    result.sort(key=lambda material: (sum(material), material[0] + material[2]))
+    return result
+
+
+def positions(material):
+    # Posiciones del material en el orden de los índices
+    white_men, white_kings, red_men, red_kings = material
+    for white_men_mask in _combinations(WHITE_MEN_SQUARES, white_men):
+        for red_men_mask in _combinations(RED_MEN_SQUARES & ~white_men_mask, red_men):
+            occupied = white_men_mask | red_men_mask
+            for white_kings_mask in _combinations(FULL ^ occupied, white_kings):
+                for red_kings_mask in _combinations(FULL ^ (occupied | white_kings_mask), red_kings):
+                    yield Position(white_men_mask, white_kings_mask, red_men_mask, red_kings_mask)
+
+
+def parents(index, material, sizes):
+    # Índices de las posiciones del mismo material desde las que se llega a
+    # esta con un movimiento sin captura ni coronación: ha movido el rival del
+    # que tiene el turno, un hombre una casilla hacia atrás o una dama una
+    # casilla en cualquier dirección
+    masks = list(index_masks(index, material, sizes))
+    white = masks.pop()
+    empty = FULL ^ (masks[0] | masks[1] | masks[2] | masks[3])
+    men, kings = (2, 3) if white else (0, 1)
+    directions = RED_DIRECTIONS if white else WHITE_DIRECTIONS
+    result = []
+
+    def add(group, moved):
+        parent = masks[:]
+        parent[group] = moved
+        result.append(masks_index(*parent, not white, sizes))
+
+    for forward, back in directions:
+        origins = back(masks[men]) & empty
+        while origins:
+            bit = origins & -origins
+            origins ^= bit
+            add(men, masks[men] ^ bit ^ forward(bit))
+    king_mask = masks[kings]
+    while king_mask:
+        king = king_mask & -king_mask
+        king_mask ^= king
+        for step in KING_DIRECTIONS:
+            origin = step(king) & empty
+            if origin:
+                add(kings, masks[kings] ^ king ^ origin)
+    return result
+
+
+# Al final, lo que no se ha resuelto (0) pasa a tablas
+DRAW_FILL = bytes([DRAW_VALUE]) + bytes(range(1, 256))
+
+
+def generate_table(material, solved):
+    # Análisis retrógrado de un material. solved tiene las tablas de los
+    # materiales a los que se llega capturando o coronando. Los resultados se
+    # fijan por distancia creciente: una posición gana en cuanto un hijo
+    # pierde y pierde cuando todos sus hijos ya ganan. Los padres se generan
+    # deshaciendo movimientos y las posiciones de cada distancia se buscan en
+    # la propia tabla, así que hacen falta unos cuatro bytes por posición.
+    size = table_size(material)
+    sizes = group_sizes(material)
+    values = bytearray(size)
+    # Hijos del mismo material que aún no se sabe que ganan
+    remaining = bytearray(size)
+    loss_distance = bytearray(size)
+    # 1: tiene unas tablas fuera de la tabla
+    draws = bytearray(size)
+    child_sizes = {}
+
+    def set_value(index, distance):
+        if distance > MAX_DISTANCE:
+            raise ValueError(f"distancia demasiado larga en {material}")
+        values[index] = distance + 2
+
+    # Movimientos de cada posición: los que cambian el material se resuelven
+    # con las tablas ya generadas; una victoria así es provisional, porque
+    # dentro de la tabla puede aparecer otra más corta
+    for position in positions(material):
+        index = position_index(position, True, sizes)
+        for white in (True, False):
+            men, king_row = (position.white_men, WHITE_KING_ROW) if white else (position.red_men, RED_KING_ROW)
+            win = None
+            for move in position.get_all_moves(white):
+                origin, target, captured = move
+                if not captured and not (men >> origin & 1 and king_row >> target & 1):
+                    remaining[index] += 1
+                    continue
+                undo = position.make(move)
+                child_material = signature(position)
+                if not child_material[0] + child_material[1] or not child_material[2] + child_material[3]:
+                    # El rival se queda sin piezas y pierde sin mover
+                    result, distance = LOSS, 0
+                else:
+                    if child_material not in child_sizes:
+                        child_sizes[child_material] = group_sizes(child_material)
+                    child = position_index(position, not white, child_sizes[child_material])
+                    result, distance = decode(solved[child_material][child])
+                position.unmake(undo)
+                if result == DRAW:
+                    draws[index] = 1
+                elif result == LOSS:
+                    win = distance + 1 if win is None else min(win, distance + 1)
+                else:
+                    loss_distance[index] = max(loss_distance[index], distance + 1)
+            if win is not None:
+                set_value(index, win)
+            elif not remaining[index] and not draws[index]:
+                set_value(index, loss_distance[index])
+            index += 1
+
+    for distance in range(MAX_DISTANCE + 1):
+        value = distance + 2
+        index = values.find(value)
+        while index >= 0:
+            for parent in parents(index, material, sizes):
+                if distance % 2 == 0:
+                    if not values[parent] or values[parent] > value + 1:
+                        set_value(parent, distance + 1)
+                elif not values[parent]:
+                    remaining[parent] -= 1
+                    loss_distance[parent] = max(loss_distance[parent], distance + 1)
+                    if not remaining[parent] and not draws[parent]:
+                        set_value(parent, loss_distance[parent])
+            index = values.find(value, index + 1)
+
+    # Lo que no se ha resuelto no puede forzarse por ninguno de los dos. Los
+    # hombres rojos se numeran entre las casillas que dejan libres los blancos,
+    # así que al final del bloque de cada grupo de hombres blancos quedan
+    # índices sin posición, que siguen a 0.
+    values = values.translate(DRAW_FILL)
+    block = size // sizes[0]
+    for rank, white_men in enumerate(_combinations(WHITE_MEN_SQUARES, material[0])):
+        used = BINOMIAL[(RED_MEN_SQUARES & ~white_men).bit_count()][material[2]] * block // sizes[1]
+        values[rank * block + used:(rank + 1) * block] = bytes(block - used)
+    return values
+
+
+def generate(directory, max_pieces, progress=None):
+    # Genera todas las tablas de hasta max_pieces piezas. Las que ya existen se
+    # reutilizan, así que se puede ampliar un directorio generado antes. Las
+    # tablas resueltas se leen con mmap: en memoria solo está la que se genera.
+    os.makedirs(directory, exist_ok=True)
+    solved = {}
+    try:
+        for material in materials(max_pieces):
+            path = os.path.join(directory, file_name(material))
+            if not os.path.exists(path):
+                values = generate_table(material, solved)
+                with open(path + ".tmp", "wb") as file:
+                    file.write(values)
+                os.replace(path + ".tmp", path)
+                if progress is not None:
+                    progress(material, values)
+                del values
+            with open(path, "rb") as file:
+                solved[material] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    finally:
+        for table in solved.values():
+            table.close()
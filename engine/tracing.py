@@ -0,0 +1,98 @@
+from array import array
+
+from .transposition import pack_move, unpack_move
+
+# Observadores del árbol de búsqueda. minimax solo llama a child/score cuando
+# el observador está activo, así que sin trazas la búsqueda no paga nada.
+
+MAX_PLY = 128
+
+
+class NullTracer:
+    enabled = False
+
+    def root(self, depth):
+        return 0
+
+    def child(self, parent, move, ply):
+        return 0
+
+    def score(self, node, score):
+        pass
+
+
+class CountingTracer(NullTracer):
+    # Solo cuenta nodos por ply e iteraciones
+    enabled = True
+
+    def __init__(self):
+        self.iterations = 0
+        self.nodes = [0] * MAX_PLY
+
+    def root(self, depth):
+        self.iterations += 1
+        self.nodes[0] += 1
+        return 0
+
+    def child(self, parent, move, ply):
+        if ply < MAX_PLY:
+            self.nodes[ply] += 1
+        return 0
+
+    def total_nodes(self):
+        return sum(self.nodes)
+
+
+class TreeRecorder(NullTracer):
+    # Guarda el árbol completo en arrays reservados de antemano. Cada iteración
+    # de la profundización añade su propia raíz. Cuando el buffer se llena los
+    # nodos nuevos se descartan y se cuentan en dropped. last_root es la raíz
+    # de la última iteración terminada (la única cuya raíz recibe puntuación).
+    enabled = True
+
+    def __init__(self, capacity=1 << 16):
+        self.capacity = capacity
+        self.parents = array('i', [0]) * capacity
+        self.moves = array('Q', [0]) * capacity
+        self.scores = array('d', [0.0]) * capacity
+        self.plies = array('B', [0]) * capacity
+        self.size = 0
+        self.dropped = 0
+        self.last_root = -1
+
+    def clear(self):
+        self.size = 0
+        self.dropped = 0
+        self.last_root = -1
+
+    def _add(self, parent, packed_move, ply):
+        if self.size == self.capacity:
+            self.dropped += 1
+            return -1
+        node = self.size
+        self.parents[node] = parent
+        self.moves[node] = packed_move
+        self.scores[node] = 0.0
+        self.plies[node] = min(ply, 255)
+        self.size += 1
+        return node
+
+    def root(self, depth):
+        return self._add(-1, 0, 0)
+
+    def child(self, parent, move, ply):
+        if parent < 0:
+            self.dropped += 1
+            return -1
+        return self._add(parent, pack_move(move), ply)
+
+    def score(self, node, score):
+        if node >= 0:
+            self.scores[node] = score
+            if self.parents[node] < 0:
+                self.last_root = node
+
+    def nodes(self):
+        # (nodo, padre, movimiento, puntuación) de cada nodo guardado
+        for node in range(self.size):
+            yield node, self.parents[node], unpack_move(self.moves[node]), self.scores[node]
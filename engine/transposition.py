@@ -0,0 +1,83 @@
+from array import array
+
+# Tipos de cota guardados junto a cada puntuación (0 marca una entrada vacía)
+EXACT, LOWER, UPPER = 1, 2, 3
+
+# Bytes por entrada: clave, puntuación y movimiento (8 cada uno) más
+# profundidad, tipo de cota y generación (1 cada uno)
+ENTRY_SIZE = 27
+
+
+def pack_move(move):
+    if move is None:
+        return 0
+    origin, target, captured = move
+    return origin | target << 5 | captured << 10
+
+
+def unpack_move(packed):
+    if not packed:
+        return None
+    return packed & 0x1F, packed >> 5 & 0x1F, packed >> 10
+
+
+class TranspositionTable:
+    # Tabla de tamaño fijo guardada en arrays paralelos. Cada cubeta tiene dos
+    # entradas: la primera conserva la búsqueda más profunda y la segunda se
+    # reemplaza siempre.
+
+    def __init__(self, size_mb=16):
+        self.size_mb = size_mb
+        self.buckets = max(1, int(size_mb * 1024 * 1024) // (2 * ENTRY_SIZE))
+        slots = 2 * self.buckets
+        self.keys = array('Q', [0]) * slots
+        self.scores = array('d', [0.0]) * slots
+        self.moves = array('Q', [0]) * slots
+        self.depths = array('b', [0]) * slots
+        self.flags = array('B', [0]) * slots
+        self.ages = array('B', [0]) * slots
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def clear(self):
+        slots = 2 * self.buckets
+        self.keys = array('Q', [0]) * slots
+        self.flags = array('B', [0]) * slots
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def new_search(self):
+        # Las entradas de búsquedas anteriores siguen sirviendo, pero ya no
+        # protegen su casilla de profundidad
+        self.generation = (self.generation + 1) & 0xFF
+
+    def probe(self, key):
+        self.probes += 1
+        slot = key % self.buckets * 2
+        keys, flags = self.keys, self.flags
+        if keys[slot] != key or not flags[slot]:
+            slot += 1
+            if keys[slot] != key or not flags[slot]:
+                return None
+        self.hits += 1
+        return self.depths[slot], flags[slot], self.scores[slot], unpack_move(self.moves[slot])
+
+    def store(self, key, depth, flag, score, move):
+        self.stores += 1
+        slot = key % self.buckets * 2
+        if (self.keys[slot] != key and self.flags[slot] and self.ages[slot] == self.generation
+                and self.depths[slot] > depth):
+            slot += 1
+        self.keys[slot] = key
+        self.depths[slot] = depth
+        self.flags[slot] = flag
+        self.scores[slot] = score
+        self.moves[slot] = pack_move(move)
+        self.ages[slot] = self.generation
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
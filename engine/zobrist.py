@@ -0,0 +1,30 @@
+import random
+
+# Claves Zobrist: un número aleatorio de 64 bits por tipo de pieza y casilla
+# oscura. La clave de una posición es el XOR de las claves de sus piezas, así
+# que mover, capturar o coronar solo cuesta un par de XOR.
+WHITE_MAN, WHITE_KING, RED_MAN, RED_KING = range(4)
+
+_random = random.Random(0x5EED)
+PIECE_KEYS = [[_random.getrandbits(64) for _ in range(32)] for _ in range(4)]
+
+# Se combina con la clave cuando juegan las rojas (jugador minimizador)
+SIDE_KEY = _random.getrandbits(64)
+
+
+def piece_kind(white, king):
+    if white:
+        return WHITE_KING if king else WHITE_MAN
+    return RED_KING if king else RED_MAN
+
+
+def hash_masks(*masks):
+    # masks en el orden hombres blancos, damas blancas, hombres rojos, damas rojas
+    key = 0
+    for kind, mask in enumerate(masks):
+        keys = PIECE_KEYS[kind]
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            key ^= keys[bit.bit_length() - 1]
+    return key
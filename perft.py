@@ -0,0 +1,172 @@
+import argparse
+import sys
+import time
+
+from engine import Position, to_square
+
+# Perft: cuenta las posiciones hoja a profundidad N para comprobar la
+# generación de movimientos y medir su velocidad. Cada backend debe dar
+# exactamente las cuentas de referencia.
+#
+#   python perft.py --depth 6 --backend all
+
+# Diagramas de la fila 0 (lado blanco) a la 7: w/W hombre/dama blanca,
+# r/R hombre/dama roja, "." casilla vacía. El booleano indica si mueven las blancas.
+POSITIONS = {
+    "start": ([
+        ".w.w.w.w",
+        "w.w.w.w.",
+        ".w.w.w.w",
+        "........",
+        "........",
+        "r.r.r.r.",
+        ".r.r.r.r",
+        "r.r.r.r.",
+    ], True),
+    # Damas con filas de piezas rivales en la diagonal y capturas encadenadas
+    "king_runs": ([
+        ".W......",
+        "..r.....",
+        "........",
+        "....r...",
+        ".....r..",
+        "......r.",
+        ".r......",
+        "R.....w.",
+    ], True),
+    # Capturas que coronan y damas rojas rodeadas
+    "promotion": ([
+        "........",
+        "..r.....",
+        ".w.w....",
+        "..R.....",
+        ".w.w.w..",
+        "w.....w.",
+        ".r.r....",
+        "........",
+    ], False),
+    # Medio juego con muchas capturas posibles para ambos
+    "middlegame": ([
+        ".w.w.w..",
+        "w...w...",
+        ".w.w.w.w",
+        "r.w...r.",
+        ".r.r.r..",
+        "r...r...",
+        ".r.r...r",
+        "r.r.....",
+    ], True),
+    # Final de damas con el tablero casi vacío
+    "kings_endgame": ([
+        "........",
+        "..W.....",
+        "........",
+        "....R...",
+        "...w....",
+        "....R...",
+        ".....W..",
+        "........",
+    ], False),
+}
+
+# Cuentas por profundidad, empezando en 1
+REFERENCE = {
+    "start": [7, 49, 379, 2872, 23582, 189143, 1585096, 13019316],
+    "king_runs": [3, 19, 40, 282, 1001, 7340],
+    "promotion": [8, 69, 503, 4283, 29436, 246840],
+    "middlegame": [6, 35, 192, 1141, 6857, 43600],
+    "kings_endgame": [8, 66, 471, 3506, 24686, 176548],
+}
+
+
+def parse_diagram(rows):
+    masks = [0, 0, 0, 0]
+    kinds = {"w": 0, "W": 1, "r": 2, "R": 3}
+    for row, line in enumerate(rows):
+        for col, char in enumerate(line):
+            if char == ".":
+                continue
+            if (row + col) % 2 == 0:
+                raise ValueError(f"pieza en casilla clara ({row}, {col})")
+            masks[kinds[char]] |= 1 << to_square(row, col)
+    return Position(*masks)
+
+
+def perft_position(position, depth, white):
+    moves = position.get_all_moves(white)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        undo = position.make(move)
+        nodes += perft_position(position, depth - 1, not white)
+        position.unmake(undo)
+    return nodes
+
+
+def perft_board(board, depth, white):
+    from board import get_all_moves
+    from constants import WHITE, RED
+
+    def count(depth, white):
+        moves = get_all_moves(board, WHITE if white else RED)
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            undo = board.apply_move(*move)
+            nodes += count(depth - 1, not white)
+            board.undo_move(undo)
+        return nodes
+
+    return count(depth, white)
+
+
+def bitboard_backend(position):
+    return lambda depth, white: perft_position(position.copy(), depth, white)
+
+
+def board_backend(position):
+    # Board dibuja con pygame, así que solo se importa si se pide este backend
+    from board import Board
+    board = Board.from_position(position)
+    return lambda depth, white: perft_board(board, depth, white)
+
+
+BACKENDS = {
+    "bitboard": bitboard_backend,
+    "board": board_backend,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft de la generación de movimientos")
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--backend", choices=list(BACKENDS) + ["all"], default="bitboard")
+    parser.add_argument("--position", choices=list(POSITIONS), action="append")
+    args = parser.parse_args(argv)
+
+    backends = list(BACKENDS) if args.backend == "all" else [args.backend]
+    failures = 0
+    print(f"{'posición':<14} {'backend':<9} {'prof':>4} {'nodos':>12} {'nodos/s':>12}")
+    for name in args.position or POSITIONS:
+        rows, white = POSITIONS[name]
+        position = parse_diagram(rows)
+        reference = REFERENCE.get(name, [])
+        for backend in backends:
+            perft = BACKENDS[backend](position)
+            for depth in range(1, args.depth + 1):
+                start = time.perf_counter()
+                nodes = perft(depth, white)
+                elapsed = time.perf_counter() - start
+                status = ""
+                if depth <= len(reference) and nodes != reference[depth - 1]:
+                    status = f"  ERROR: se esperaban {reference[depth - 1]}"
+                    failures += 1
+                nps = nodes / elapsed if elapsed > 0 else 0
+                print(f"{name:<14} {backend:<9} {depth:>4} {nodes:>12} {nps:>12.0f}{status}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
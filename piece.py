@@ -1,4 +1,36 @@
+import os
 import pygame
+from constants import SQUARE_SIZE, GREY
+
+CROWN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "crown.png")
+_crown = None
+_sprites = {}
+
+
+def get_crown():
+    # La imagen se carga la primera vez que se dibuja una dama
+    global _crown
+    if _crown is None:
+        _crown = pygame.transform.scale(pygame.image.load(CROWN_PATH), (44, 25))
+    return _crown
+
+
+def get_sprite(color, king):
+    # Cada tipo de pieza se dibuja una sola vez sobre una superficie
+    # transparente del tamaño de una casilla
+    sprite = _sprites.get((color, king))
+    if sprite is None:
+        sprite = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
+        center = SQUARE_SIZE // 2
+        radius = SQUARE_SIZE // 2 - Piece.PADDING
+        pygame.draw.circle(sprite, GREY, (center, center), radius + Piece.OUTLINE)
+        pygame.draw.circle(sprite, color, (center, center), radius)
+        if king:
+            crown = get_crown()
+            sprite.blit(crown, (center - crown.get_width() // 2, center - crown.get_height() // 2))
+        sprite = sprite.convert_alpha()
+        _sprites[(color, king)] = sprite
+    return sprite
 
 
 class Piece:
@@ -22,11 +54,7 @@ class Piece:
         self.king = True
 
     def draw(self, win):
-        radius = SQUARE_SIZE // 2 - self.PADDING
-        pygame.draw.circle(win, GREY, (self.x, self.y), radius + self.OUTLINE)
-        pygame.draw.circle(win, self.color, (self.x, self.y), radius)
-        if self.king:
-            win.blit(CROWN, (self.x - CROWN.get_width() // 2, self.y - CROWN.get_height() // 2))
+        win.blit(get_sprite(self.color, self.king), (self.x - SQUARE_SIZE // 2, self.y - SQUARE_SIZE // 2))
 
     def move(self, row, col):
         self.row = row
@@ -0,0 +1,89 @@
+import pygame
+from constants import ROWS, COLS, SQUARE_SIZE, WHITE, BLACK
+from board import get_background
+from piece import get_sprite
+
+
+class Renderer:
+    # Dibuja el tablero en la ventana actualizando solo lo que cambia: guarda
+    # qué pieza se dibujó en cada casilla y, en cada cuadro, vuelve a pintar
+    # (fondo y pieza) únicamente las casillas distintas. draw devuelve los
+    # rectángulos que hay que pasar a pygame.display.update; si está vacía,
+    # el cuadro no ha cambiado y no hace falta actualizar la pantalla.
+    OVERLAY_PADDING = (10, 5)
+
+    def __init__(self, win, font):
+        self.win = win
+        self.font = font
+        # (color, dama) de la pieza dibujada en cada casilla, None si está vacía
+        self.drawn = None
+        self.overlay_text = None
+        self.overlay = None
+        self.overlay_rect = None
+
+    def invalidate(self):
+        # La próxima llamada a draw repinta toda la ventana (por ejemplo, tras
+        # mostrar otra cosa encima o si el sistema pide redibujarla)
+        self.drawn = None
+        self.overlay_text = None
+
+    def square_rect(self, row, col):
+        return pygame.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+
+    def draw(self, board, overlay_text=None):
+        full = self.drawn is None
+        if full:
+            self.win.blit(get_background(), (0, 0))
+            self.drawn = [[None] * COLS for _ in range(ROWS)]
+            self.overlay_rect = None
+
+        # Las casillas bajo el texto anterior se repintan si el texto cambia o desaparece
+        stale = set()
+        overlay_changed = overlay_text != self.overlay_text
+        if overlay_changed:
+            if self.overlay_rect is not None:
+                stale = self.squares_under(self.overlay_rect)
+            self.set_overlay(overlay_text)
+
+        dirty = []
+        background = get_background()
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = board.board[row][col]
+                state = (piece.color, piece.king) if piece != 0 else None
+                if not full and state == self.drawn[row][col] and (row, col) not in stale:
+                    continue
+                rect = self.square_rect(row, col)
+                if not full:
+                    self.win.blit(background, rect, rect)
+                    dirty.append(rect)
+                if state is not None:
+                    self.win.blit(get_sprite(*state), rect)
+                self.drawn[row][col] = state
+
+        if self.overlay is not None:
+            # El texto va encima de las casillas, así que se vuelve a dibujar si
+            # alguna de las que tapa se ha repintado
+            if full or overlay_changed or self.overlay_rect.collidelist(dirty) >= 0:
+                pygame.draw.rect(self.win, BLACK, self.overlay_rect)
+                self.win.blit(self.overlay, (self.overlay_rect.x + self.OVERLAY_PADDING[0],
+                                             self.overlay_rect.y + self.OVERLAY_PADDING[1]))
+                dirty.append(self.overlay_rect)
+
+        if full:
+            return [self.win.get_rect()]
+        return dirty
+
+    def set_overlay(self, text):
+        self.overlay_text = text
+        if text is None:
+            self.overlay = self.overlay_rect = None
+            return
+        self.overlay = self.font.render(text, True, WHITE)
+        self.overlay_rect = pygame.Rect(0, 0, self.overlay.get_width() + 2 * self.OVERLAY_PADDING[0],
+                                        self.overlay.get_height() + 2 * self.OVERLAY_PADDING[1])
+
+    def squares_under(self, rect):
+        return {(row, col)
+                for row in range(rect.top // SQUARE_SIZE, min(ROWS, (rect.bottom - 1) // SQUARE_SIZE + 1))
+                for col in range(rect.left // SQUARE_SIZE, min(COLS, (rect.right - 1) // SQUARE_SIZE + 1))}
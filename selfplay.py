@@ -0,0 +1,90 @@
+import argparse
+import random
+import sys
+
+from engine import Position, SearchContext, TranspositionTable, iterative_deepening
+
+# Partidas del motor contra sí mismo con dos configuraciones de búsqueda,
+# para medir si una poda o reducción que ahorra nodos cuesta fuerza:
+#
+#   python selfplay.py --a pvs,lmr,futility --b pvs --depth 6 --games 20
+#
+# Cada apertura (unas plies al azar) se juega dos veces cambiando los
+# colores. Una partida sin ganador tras --max-plies cuenta como tablas.
+
+OPTIONS = ("pvs", "lmr", "futility", "probcut")
+
+
+def parse_options(text):
+    options = {}
+    for name in filter(None, text.split(",")):
+        if name not in OPTIONS:
+            raise ValueError(f"opción desconocida: {name}")
+        options[name] = True
+    return options
+
+
+def play_game(players, seed, opening_plies, max_plies, depth, time_limit):
+    # players: (opciones de las blancas, opciones de las rojas). Devuelve
+    # 1 si ganan las blancas, -1 si ganan las rojas y 0 en tablas, y los
+    # nodos de cada color.
+    rng = random.Random(seed)
+    position = Position()
+    white = True
+    for _ in range(opening_plies):
+        moves = position.get_all_moves(white)
+        if not moves:
+            break
+        position.make(rng.choice(moves))
+        white = not white
+
+    tables = TranspositionTable(16), TranspositionTable(16)
+    nodes = [0, 0]
+    for _ in range(max_plies):
+        if position.is_game_over(white):
+            return (-1 if white else 1), nodes
+        side = 0 if white else 1
+        tables[side].new_search()
+        context = SearchContext(tables[side], **players[side])
+        _, move = iterative_deepening(position, white, time_limit, context, depth)
+        nodes[side] += context.nodes
+        position.make(move)
+        white = not white
+    return 0, nodes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Partidas entre dos configuraciones de búsqueda")
+    parser.add_argument("--a", default="", help="opciones separadas por comas: " + ", ".join(OPTIONS))
+    parser.add_argument("--b", default="")
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--time", type=float, default=float('inf'), help="segundos por movimiento")
+    parser.add_argument("--games", type=int, default=10, help="aperturas; cada una se juega con los dos colores")
+    parser.add_argument("--opening-plies", type=int, default=4)
+    parser.add_argument("--max-plies", type=int, default=150)
+    args = parser.parse_args(argv)
+
+    a, b = parse_options(args.a), parse_options(args.b)
+    wins = draws = losses = 0
+    nodes_a = nodes_b = 0
+    for game in range(args.games):
+        for a_white in (True, False):
+            players = (a, b) if a_white else (b, a)
+            result, nodes = play_game(players, game, args.opening_plies, args.max_plies, args.depth, args.time)
+            if not a_white:
+                result = -result
+                nodes.reverse()
+            wins += result == 1
+            draws += result == 0
+            losses += result == -1
+            nodes_a += nodes[0]
+            nodes_b += nodes[1]
+        print(f"apertura {game + 1:>3}: +{wins} ={draws} -{losses}", flush=True)
+
+    print(f"A ({args.a or 'base'}) contra B ({args.b or 'base'}): +{wins} ={draws} -{losses}")
+    print(f"nodos A {nodes_a}  nodos B {nodes_b}  ({nodes_a / nodes_b:.2f}x)" if nodes_b else "")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,10 @@
+import os
 import pygame
 import sys
 from pgmpy.models import BayesianNetwork
 from pgmpy.factors.discrete import TabularCPD
 from pgmpy.inference import VariableElimination
 
-# Inicializar pygame
-pygame.init()
-
 # Configuración de la ventana
 WIDTH, HEIGHT = 800, 800
 ROWS, COLS = 8, 8
@@ -19,15 +17,16 @@ RED = (255, 0, 0)
 BLUE = (0, 0, 255)
 GREEN = (0, 255, 0)
 
-# Inicializar la ventana
-WIN = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption('Juego de Damas')
+CROWN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crown.png')
+_crown = None
 
-# Cargar imágenes
-CROWN = pygame.transform.scale(pygame.image.load('crown.png'), (44, 25))
 
-# Fuente para mensajes de texto
-FONT = pygame.font.SysFont('Open Sans', 24)
+def get_crown():
+    # La imagen se carga la primera vez que se dibuja una dama
+    global _crown
+    if _crown is None:
+        _crown = pygame.transform.scale(pygame.image.load(CROWN_PATH), (44, 25))
+    return _crown
 
 
 class Piece:
@@ -55,7 +54,8 @@ class Piece:
         pygame.draw.circle(win, BLACK, (self.x, self.y), radius + self.OUTLINE)
         pygame.draw.circle(win, self.color, (self.x, self.y), radius)
         if self.king:
-            win.blit(CROWN, (self.x - CROWN.getWidth() // 2, self.y - CROWN.getHeight() // 2))
+            crown = get_crown()
+            win.blit(crown, (self.x - crown.get_width() // 2, self.y - crown.get_height() // 2))
 
     def move(self, row, col):
         self.row = row
@@ -249,61 +249,121 @@ def draw_valid_moves(win, moves):
         pygame.draw.circle(win, GREEN, (col * SQUARE_SIZE + SQUARE_SIZE // 2, row * SQUARE_SIZE + SQUARE_SIZE // 2), 15)
 
 
-def draw_message(win, message):
-    text = FONT.render(message, True, (255, 0, 0))
+def draw_message(win, font, message):
+    text = font.render(message, True, (255, 0, 0))
     win.blit(text, (10, 10))
 
 
-def computer_move(board):
-    # Definir la red bayesiana
-    model = BayesianNetwork([('Heuristic', 'Move')])
-
-    # Definir las CPDs
-    cpd_heuristic = TabularCPD(variable='Heuristic', variable_card=2, values=[[0.5], [0.5]])
-    cpd_move = TabularCPD(variable='Move', variable_card=2,
-                          values=[[0.8, 0.2], [0.2, 0.8]],
-                          evidence=['Heuristic'], evidence_card=[2])
-
-    # Agregar las CPDs al modelo
-    model.add_cpds(cpd_heuristic, cpd_move)
+# Política de la IA: una red bayesiana pequeña con un nodo oculto Heuristic
+# (si el movimiento es bueno) del que dependen los rasgos observados de cada
+# movimiento y la decisión Move. La red se construye y se comprueba una sola
+# vez; como los rasgos son discretos, la probabilidad de Move para cada
+# combinación se calcula al crearla y elegir un movimiento es mirar una tabla.
+CAPTURE_STATES = 3  # ninguna, una o varias piezas capturadas
+CROWN_STATES = 2    # el movimiento corona
+DANGER_STATES = 2   # la pieza queda donde el rival puede capturarla
 
-    # Verificar el modelo
-    assert model.check_model()
 
-    # Realizar inferencia
-    inference = VariableElimination(model)
-
-    all_moves = board.get_all_moves(RED)
-    if not all_moves:
+class BayesianPolicy:
+    def __init__(self):
+        self.model = BayesianNetwork([('Heuristic', 'Move'), ('Heuristic', 'Capture'),
+                                      ('Heuristic', 'Crown'), ('Heuristic', 'Danger')])
+        # Columnas: Heuristic malo, Heuristic bueno
+        self.model.add_cpds(
+            TabularCPD(variable='Heuristic', variable_card=2, values=[[0.5], [0.5]]),
+            TabularCPD(variable='Move', variable_card=2, values=[[0.8, 0.2], [0.2, 0.8]],
+                       evidence=['Heuristic'], evidence_card=[2]),
+            TabularCPD(variable='Capture', variable_card=CAPTURE_STATES,
+                       values=[[0.7, 0.3], [0.25, 0.5], [0.05, 0.2]],
+                       evidence=['Heuristic'], evidence_card=[2]),
+            TabularCPD(variable='Crown', variable_card=CROWN_STATES, values=[[0.95, 0.8], [0.05, 0.2]],
+                       evidence=['Heuristic'], evidence_card=[2]),
+            TabularCPD(variable='Danger', variable_card=DANGER_STATES, values=[[0.4, 0.8], [0.6, 0.2]],
+                       evidence=['Heuristic'], evidence_card=[2]))
+        assert self.model.check_model()
+
+        # P(Move = 1 | rasgos) para todas las combinaciones, indexada por rasgos
+        inference = VariableElimination(self.model)
+        self.table = {}
+        for capture in range(CAPTURE_STATES):
+            for crown in range(CROWN_STATES):
+                for danger in range(DANGER_STATES):
+                    posterior = inference.query(['Move'], evidence={'Capture': capture, 'Crown': crown,
+                                                                    'Danger': danger}, show_progress=False)
+                    self.table[(capture, crown, danger)] = float(posterior.values[1])
+
+    def features(self, board, piece, move, skipped):
+        row, col = move
+        capture = min(len(skipped), CAPTURE_STATES - 1)
+        crown = int(not piece.king and row == (7 if piece.color == RED else 0))
+        return capture, crown, int(self.in_danger(board, piece, row, col, skipped))
+
+    def in_danger(self, board, piece, row, col, skipped):
+        # Aproximado: una pieza rival al lado con la casilla opuesta libre
+        # (contando la que deja la pieza y las capturadas). Solo se miran
+        # saltos cortos, como los de los hombres.
+        freed = {(piece.row, piece.col)} | {(p.row, p.col) for p in skipped}
+        enemy_forward = -1 if piece.color == RED else 1
+        for row_step in (-1, 1):
+            for col_step in (-1, 1):
+                r, c = row + row_step, col + col_step
+                landing_r, landing_c = row - row_step, col - col_step
+                if not (0 <= r < ROWS and 0 <= c < COLS and 0 <= landing_r < ROWS and 0 <= landing_c < COLS):
+                    continue
+                enemy = board.board[r][c]
+                if enemy == 0 or enemy.color == piece.color or enemy in skipped:
+                    continue
+                # Un hombre rival solo salta hacia delante
+                if not enemy.king and -row_step != enemy_forward:
+                    continue
+                if board.board[landing_r][landing_c] == 0 or (landing_r, landing_c) in freed:
+                    return True
+        return False
+
+    def score_moves(self, board, color):
+        # Puntúa de una vez todos los movimientos de get_all_moves: lista de
+        # (probabilidad, pieza, destino, capturadas)
+        scored = []
+        for piece, moves in board.get_all_moves(color).items():
+            for move, skipped in moves.items():
+                scored.append((self.table[self.features(board, piece, move, skipped)], piece, move, skipped))
+        return scored
+
+    def choose(self, scored):
+        if not scored:
+            return None
+        return max(scored, key=lambda entry: entry[0])
+
+
+def computer_move(board, policy):
+    choice = policy.choose(policy.score_moves(board, RED))
+    if choice is None:
         return
-
-    # Evaluar heurísticas
-    move_scores = []
-    for piece, moves in all_moves.items():
-        for move in moves.keys():
-            # Ejemplo de heurística: maximizar capturas
-            score = len(moves[move])
-            move_scores.append((piece, move, score))
-
-    # Seleccionar el mejor movimiento basado en la heurística
-    best_move = max(move_scores, key=lambda x: x[2])
-
-    # Realizar el movimiento
-    piece, move, _ = best_move
+    _, piece, move, skipped = choice
     board.move(piece, move[0], move[1])
-    skipped = all_moves[piece][move]
-    if skipped:
+    # Tras una captura la misma pieza sigue capturando mientras pueda
+    while skipped:
         board.remove(skipped)
-        # Verificar si hay capturas adicionales disponibles
-        valid_moves = board.valid_moves(piece)
-        if valid_moves:
-            computer_move(board)
+        captures = [(policy.table[policy.features(board, piece, move, skipped)], piece, move, skipped)
+                    for move, skipped in board.valid_moves(piece).items() if skipped]
+        choice = policy.choose(captures)
+        if choice is None:
+            break
+        _, piece, move, skipped = choice
+        board.move(piece, move[0], move[1])
 
 
 def main():
+    pygame.init()
+    win = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption('Juego de Damas')
+    # Fuente para mensajes de texto
+    font = pygame.font.SysFont('Open Sans', 24)
+
     run = True
     clock = pygame.time.Clock()
     board = Board()
+    policy = BayesianPolicy()
     selected_piece = None
     valid_moves = {}
     player_turn = True
@@ -313,7 +373,7 @@ def main():
         clock.tick(60)
 
         if not player_turn:
-            computer_move(board)
+            computer_move(board, policy)
             player_turn = True
 
         for event in pygame.event.get():
@@ -349,11 +409,11 @@ def main():
                         selected_piece = piece
                         valid_moves = board.valid_moves(piece)
 
-        board.draw(WIN)
+        board.draw(win)
         if selected_piece:
-            draw_valid_moves(WIN, valid_moves)
+            draw_valid_moves(win, valid_moves)
         if message:
-            draw_message(WIN, message)
+            draw_message(win, font, message)
         pygame.display.update()
 
 
@@ -0,0 +1,180 @@
+import pygame
+from constants import WHITE, BLACK, RED, GREY
+from engine.transposition import unpack_move
+
+# Vista del árbol de búsqueda que guarda TreeRecorder. De cada movimiento de
+# la IA se toma una foto (TreeSnapshot) con la última iteración terminada,
+# recortada a la variante principal y a los mejores hijos de cada nodo hasta
+# un máximo de nodos. La disposición es por niveles: las hojas se reparten
+# de izquierda a derecha y cada padre queda centrado sobre sus hijos, así que
+# todo es lineal en el número de nodos guardados.
+
+# Nodos que se muestran como máximo y mejores hijos que se expanden por nodo
+MAX_NODES = 300
+TOP_K = 3
+MARGIN = 30
+TITLE_HEIGHT = 30
+NODE_RADIUS = 5
+# Separación mínima entre nodos vecinos para escribir el movimiento debajo
+LABEL_SPACING = 40
+
+
+def move_text(move):
+    # Casillas numeradas del 1 al 32, como en la notación de las damas
+    origin, target, captured = move
+    return f"{origin + 1}{'x' if captured else '-'}{target + 1}"
+
+
+class TreeSnapshot:
+    def __init__(self, recorder, maximizing, title="", max_nodes=MAX_NODES, top_k=TOP_K):
+        # maximizing: si en la raíz mueve el jugador que maximiza, para
+        # ordenar los hijos de cada nodo del mejor al peor
+        self.title = title
+        self.parents = []
+        self.moves = []
+        self.scores = []
+        self.levels = []
+        self.on_pv = []
+        self.children = []
+        self.x = []
+        self.leaves = 0
+        self.depth = 0
+        self.recorded = 0
+        self.dropped = recorder.dropped
+
+        root = recorder.last_root
+        if root < 0:
+            if not recorder.size:
+                return
+            root = 0
+        # Los nodos de una iteración van seguidos hasta la raíz de la siguiente
+        end = root + 1
+        while end < recorder.size and recorder.parents[end] >= 0:
+            end += 1
+        self.recorded = end - root
+
+        # Hijos de cada nodo por movimiento: las búsquedas repetidas (ventanas
+        # de aspiración, PVS) vuelven a crear el mismo hijo y vale el último
+        children = {}
+        for node in range(root + 1, end):
+            children.setdefault(recorder.parents[node], {})[recorder.moves[node]] = node
+        scores = recorder.scores
+
+        def ranked(node, level):
+            nodes = list(children.get(node, {}).values())
+            nodes.sort(key=lambda child: scores[child], reverse=(level % 2 == 0) == maximizing)
+            return nodes
+
+        # Variante principal: el mejor hijo de cada nodo desde la raíz
+        pv = {root}
+        node, level = root, 0
+        while len(pv) < max_nodes:
+            best = ranked(node, level)
+            if not best:
+                break
+            node, level = best[0], level + 1
+            pv.add(node)
+
+        # Recorrido en anchura con los top_k mejores hijos de cada nodo; los
+        # huecos de la variante principal están reservados
+        extra = max_nodes - len(pv)
+        index = {}
+        queue = [(root, -1, 0)]
+        for node, parent, level in queue:
+            index[node] = len(self.parents)
+            self.parents.append(index[parent] if parent >= 0 else -1)
+            self.moves.append(unpack_move(recorder.moves[node]))
+            self.scores.append(scores[node])
+            self.levels.append(level)
+            self.on_pv.append(node in pv)
+            self.children.append([])
+            if parent >= 0:
+                self.children[index[parent]].append(index[node])
+            for child in ranked(node, level)[:top_k]:
+                if child in pv:
+                    queue.append((child, node, level + 1))
+                elif extra > 0:
+                    extra -= 1
+                    queue.append((child, node, level + 1))
+        self.layout()
+
+    def __len__(self):
+        return len(self.parents)
+
+    def layout(self):
+        # Hojas en orden de recorrido en profundidad; cada padre en el centro de sus hijos
+        if not self.parents:
+            return
+        self.x = [0.0] * len(self.parents)
+        self.depth = max(self.levels)
+        stack = [(0, False)]
+        while stack:
+            node, expanded = stack.pop()
+            children = self.children[node]
+            if not children:
+                self.x[node] = self.leaves
+                self.leaves += 1
+            elif expanded:
+                self.x[node] = (self.x[children[0]] + self.x[children[-1]]) / 2
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children))
+
+    def points(self, width, height):
+        # Coordenadas de cada nodo dentro de un rectángulo de width x height
+        spacing_x = (width - 2 * MARGIN) / max(1, self.leaves - 1)
+        spacing_y = (height - 2 * MARGIN - TITLE_HEIGHT) / max(1, self.depth)
+        offset_x = MARGIN if self.leaves > 1 else width / 2
+        return [(offset_x + x * spacing_x, MARGIN + TITLE_HEIGHT + level * spacing_y)
+                for x, level in zip(self.x, self.levels)], spacing_x
+
+    def caption(self):
+        text = f"{self.title}  {len(self)} de {self.recorded} nodos, profundidad {self.depth}"
+        if self.dropped:
+            text += f" ({self.dropped} nodos no cupieron)"
+        return text.strip()
+
+    def label(self, node):
+        move = self.moves[node]
+        return f"{move_text(move) if move else 'raíz'} {self.scores[node]:.1f}"
+
+
+def draw_tree(win, snapshot, font):
+    win.fill(WHITE)
+    width, height = win.get_size()
+    points, spacing = snapshot.points(width, height)
+    for node, parent in enumerate(snapshot.parents):
+        if parent >= 0:
+            pv = snapshot.on_pv[node]
+            pygame.draw.line(win, RED if pv else GREY, points[parent], points[node], 3 if pv else 1)
+    for node, point in enumerate(points):
+        pygame.draw.circle(win, RED if snapshot.on_pv[node] else BLACK, point, NODE_RADIUS)
+        if spacing >= LABEL_SPACING or snapshot.on_pv[node]:
+            text = font.render(snapshot.label(node), True, BLACK)
+            win.blit(text, (point[0] - text.get_width() // 2, point[1] + NODE_RADIUS + 2))
+    win.blit(font.render(snapshot.caption(), True, BLACK), (MARGIN, MARGIN // 2))
+
+
+def write_svg(path, snapshot, width=1600, height=900):
+    # El mismo dibujo en SVG; cada nodo lleva su movimiento y puntuación como
+    # texto emergente, así que se puede ver entero en un navegador
+    points, spacing = snapshot.points(width, height)
+    lines = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="sans-serif" '
+             f'font-size="11">',
+             f'<rect width="{width}" height="{height}" fill="white"/>',
+             f'<text x="{MARGIN}" y="{MARGIN}" font-size="14">{snapshot.caption()}</text>']
+    for node, parent in enumerate(snapshot.parents):
+        if parent >= 0:
+            (x1, y1), (x2, y2) = points[parent], points[node]
+            style = 'stroke="red" stroke-width="3"' if snapshot.on_pv[node] else 'stroke="grey"'
+            lines.append(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" {style}/>')
+    for node, (x, y) in enumerate(points):
+        colour = "red" if snapshot.on_pv[node] else "black"
+        lines.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="{NODE_RADIUS}" fill="{colour}">'
+                     f'<title>{snapshot.label(node)}</title></circle>')
+        if spacing >= LABEL_SPACING or snapshot.on_pv[node]:
+            lines.append(f'<text x="{x:.1f}" y="{y + NODE_RADIUS + 12:.1f}" text-anchor="middle">'
+                         f'{snapshot.label(node)}</text>')
+    lines.append('</svg>')
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("\n".join(lines) + "\n")